@@ -0,0 +1,99 @@
+"""
+CLI startup benchmark: wall time of `python -m <entry> --help`, the slowest
+imports behind it (python -X importtime), and a check that no heavy
+stage-specific module (torch, whisperx, the GenAI SDK, Pillow...) is
+imported at startup. Exits non-zero when one is, or when startup exceeds
+--budget seconds.
+
+    python -m benchmarks.bench_import
+    python -m benchmarks.bench_import --repeat 10 --budget 0.8 --output benchmarks/results/startup.json
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.harness import compare, write_results
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRIES = ("src.main", "src.batch")
+# Only the steps that need these may import them
+HEAVY = ("torch", "whisperx", "pyannote", "transformers", "pandas", "google.genai", "numpy", "PIL")
+
+
+def run_python(*args):
+    return subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True, text=True)
+
+
+def startup_times(entry, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        proc = run_python("-m", entry, "--help")
+        times.append(time.perf_counter() - started)
+        if proc.returncode != 0:
+            raise RuntimeError(f"{entry} --help failed:\n{proc.stderr}")
+    return times
+
+
+def slowest_imports(entry, top):
+    """(cumulative us, self us, module) for the `top` slowest imports, from -X importtime."""
+    rows = []
+    for line in run_python("-X", "importtime", "-c", f"import {entry}").stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), module.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def heavy_modules(entry):
+    code = f"import sys, {entry}; print(' '.join(m for m in {HEAVY!r} if m in sys.modules))"
+    proc = run_python("-c", code)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {entry} failed:\n{proc.stderr}")
+    return proc.stdout.split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", default=",".join(ENTRIES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    parser.add_argument("--budget", type=float, default=1.0, help="Max best-of startup time (s)")
+    parser.add_argument("--output", help="Results JSON (same format as bench_stages)")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    results = []
+    problems = []
+    for entry in args.entries.split(","):
+        times = startup_times(entry, args.repeat)
+        leaked = heavy_modules(entry)
+        result = {"name": f"startup {entry} --help", "params": {"leaked": leaked}, "repeat": args.repeat,
+                  "best_s": min(times), "mean_s": statistics.mean(times)}
+        results.append(result)
+
+        print(f"{entry} --help: best {result['best_s']:.3f}s, mean {result['mean_s']:.3f}s")
+        print(f"  {'cumulative ms':>13} {'self ms':>8}  module")
+        for cumulative_us, self_us, module in slowest_imports(entry, args.top):
+            print(f"  {cumulative_us / 1000:13.1f} {self_us / 1000:8.1f}  {module}")
+        if leaked:
+            problems.append(f"{entry} imports {', '.join(leaked)} at startup")
+        if result["best_s"] > args.budget:
+            problems.append(f"{entry} startup {result['best_s']:.2f}s exceeds the {args.budget:.2f}s budget")
+
+    if args.output:
+        print(f"\nResults written to {write_results(args.output, results)}")
+    if args.compare:
+        compare(args.compare, results)
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Ken Burns benchmark: encode fps of the frame-piping motion engine vs the
+legacy zoompan graph, on a synthetic still.
+
+    python -m benchmarks.bench_kenburns --duration 5 --repeat 3
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import ffmpeg
+import numpy as np
+from PIL import Image
+
+from src.video.motion import KenBurns, run_piped
+
+
+def make_still(path, size):
+    """Noisy gradient, so the encoder can't coast on flat areas."""
+    width, height = size
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    base = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=2)
+    noise = rng.normal(0, 24, (height, width, 3))
+    Image.fromarray(np.clip(base + noise, 0, 255).astype(np.uint8)).save(path)
+
+
+def encode(engine, backend, image_path, duration, output_path):
+    engine.backend = backend
+    frames = None
+    if backend == "zoompan":
+        stream = engine.zoompan_stream(image_path, duration)
+    else:
+        frames = engine.frames(image_path, 0, duration)
+        stream = engine.input_stream()
+    stream = stream.filter('fps', fps=engine.fps, round='up')
+    out = ffmpeg.output(stream, output_path, vcodec='libx264', pix_fmt='yuv420p', t=duration)
+    started = time.perf_counter()
+    if frames is not None:
+        run_piped(out, frames)
+    else:
+        out.run(overwrite_output=True, quiet=True)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=5.0, help="Clip length in seconds")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--resolution", default="1080x1920", help="Output WxH")
+    parser.add_argument("--source", default="1536x2752", help="Synthetic still WxH (Imagen 9:16 output size)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--backends", default="zoompan,frames")
+    args = parser.parse_args()
+
+    resolution = tuple(int(v) for v in args.resolution.split("x"))
+    source = tuple(int(v) for v in args.source.split("x"))
+    frame_count = int(round(args.duration * args.fps))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        image_path = os.path.join(tmp, "still.png")
+        make_still(image_path, source)
+        engine = KenBurns({}, resolution=resolution, fps=args.fps)
+
+        print(f"{frame_count} frames at {args.resolution}, source {args.source}, best of {args.repeat}")
+        print(f"{'backend':10} {'seconds':>8} {'enc fps':>8}")
+        for backend in args.backends.split(","):
+            times = [encode(engine, backend, image_path, args.duration, os.path.join(tmp, f"{backend}.mp4"))
+                     for _ in range(args.repeat)]
+            best = min(times)
+            print(f"{backend:10} {best:8.2f} {frame_count / best:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
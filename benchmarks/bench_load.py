@@ -0,0 +1,182 @@
+"""
+Load test of the whole pipeline against the fake GenAI backend: many poems
+at once through BatchRunner, without an API key or quota.
+
+    python -m benchmarks.bench_load --poems 20 --time-scale 0.05
+    python -m benchmarks.bench_load --poems 50 --veo --error-rate 0.05 --output benchmarks/results/load.json
+
+Alignment is seeded (synthetic word timings recorded as an up-to-date align
+step) so no speech model loads; every later step runs for real, composing
+drafts unless --full-quality. --time-scale shrinks the fake latencies and,
+with them, retry backoff, rate limits and Veo polling, so a scaled run keeps
+the same shape. Reports throughput, per-poem latency and per-call latency
+percentiles (from each run's trace.json) plus the fake backend's call and
+injected-error counts.
+"""
+import argparse
+import contextlib
+import copy
+import io
+import json
+import math
+import os
+import tempfile
+import time
+
+from benchmarks.harness import environment
+from benchmarks.synthetic import silent_audio, word_timestamps
+from src.batch import BatchRunner
+from src.pipeline import PoemRun, apply_overrides, load_config
+from src.utils.llm import backend_summary
+from src.utils.llm import configure as configure_llm
+
+RUN_ID = "load"
+# Span categories worth a latency row: API calls, downloads, Veo jobs and whole steps
+SPAN_CATEGORIES = ("llm", "generate", "download", "veo", "step")
+
+
+def percentile(values, q):
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+def scale_timing(config, scale):
+    """Shrinks the pipeline's own wall-clock knobs along with the fake latencies."""
+    llm = config.setdefault("llm", {})
+    retry = llm.setdefault("retry", {})
+    retry["base_delay"] = retry.get("base_delay", 1.0) * scale
+    retry["max_delay"] = retry.get("max_delay", 30.0) * scale
+    llm["rate_limits"] = {model: rpm / scale for model, rpm in (llm.get("rate_limits") or {}).items() if rpm}
+    veo = config.setdefault("veo", {})
+    veo["poll_interval"] = veo.get("poll_interval", 5) * scale
+    veo["max_poll_interval"] = veo.get("max_poll_interval", 30) * scale
+    veo["timeout"] = veo.get("timeout", 600) * scale
+
+
+def load_test_config(base, tmp, args):
+    config = copy.deepcopy(base)
+    config["project"] = dict(config.get("project") or {}, output_dir=os.path.join(tmp, "output"))
+    # Every poem pays for its own generation: no cross-run stores or caches
+    config["cache"] = {"dir": os.path.join(tmp, ".cache"), "assets": False, "clips": False, "text": False}
+    config["trace"] = {"enabled": True}
+    config.setdefault("batch", {})["max_poems"] = args.concurrency or args.poems
+    config.setdefault("veo", {})["enabled"] = args.veo
+
+    llm = config.setdefault("llm", {})
+    llm["backend"] = "fake"
+    llm["cache"] = {"enabled": False}
+    fake = llm.setdefault("fake", {})
+    fake["time_scale"] = args.time_scale
+    fake["seed"] = args.seed
+    errors = fake.setdefault("errors", {})
+    errors["rate"] = args.error_rate
+    errors["veo_failure_rate"] = args.veo_failure_rate
+    scale_timing(config, args.time_scale)
+    return config
+
+
+def make_poems(tmp, config, count, duration):
+    """Lyrics + shared silent audio per poem, with alignment already recorded as done."""
+    poems_dir = os.path.join(tmp, "poems")
+    os.makedirs(poems_dir, exist_ok=True)
+    audio = silent_audio(os.path.join(poems_dir, "silence.wav"), duration)
+    poems = []
+    for i in range(count):
+        words = word_timestamps(duration, seed=i)
+        lyrics = os.path.join(poems_dir, f"poem_{i:03d}.txt")
+        with open(lyrics, "w", encoding="utf-8") as f:
+            for start in range(0, len(words), 6):
+                f.write(" ".join(w["word"] for w in words[start:start + 6]) + "\n")
+
+        run = PoemRun(apply_overrides(config, audio, lyrics, log=lambda msg: None), run_id=RUN_ID, log=lambda msg: None)
+        run.prepare()
+        with open(run.timestamps_path, "w", encoding="utf-8") as f:
+            json.dump(words, f, ensure_ascii=False)
+        run.state.record("align", run.step_inputs("align"), run.step_output("align"))
+        poems.append({"lyrics": lyrics, "audio": audio, "subject": "A cheerful cartoon fish", "run_id": RUN_ID})
+    return poems
+
+
+def span_latencies(output_dir, results):
+    """Durations (s) by span name across every poem's trace.json."""
+    latencies = {}
+    for r in results:
+        path = os.path.join(output_dir, r["poem"], RUN_ID, "trace.json")
+        if not os.path.exists(path):
+            continue
+        with open(path, "r") as f:
+            events = json.load(f)["traceEvents"]
+        for e in events:
+            if e.get("ph") == "X" and e.get("cat") in SPAN_CATEGORIES:
+                latencies.setdefault((e["cat"], e["name"]), []).append(e["dur"] / 1e6)
+    return latencies
+
+
+def distribution(values):
+    return {"count": len(values), "p50": percentile(values, 50), "p95": percentile(values, 95),
+            "p99": percentile(values, 99), "max": max(values)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", default="config.yaml", help="Base config (backend and caches are overridden)")
+    parser.add_argument("--poems", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, help="Poems in flight (default: all)")
+    parser.add_argument("--duration", type=float, default=60.0, help="Audio length per poem (s)")
+    parser.add_argument("--veo", action="store_true", help="Generate videos (Veo operations) instead of images")
+    parser.add_argument("--time-scale", type=float, default=0.05, help="Multiplier on every fake latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of API calls failing with 429/503")
+    parser.add_argument("--veo-failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--full-quality", action="store_true", help="Compose final-quality videos instead of drafts")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own log")
+    parser.add_argument("--output", help="Write the summary as JSON here")
+    args = parser.parse_args()
+
+    base = load_config(args.config) if os.path.exists(args.config) else {}
+    with tempfile.TemporaryDirectory() as tmp:
+        config = load_test_config(base, tmp, args)
+        configure_llm(config)
+        poems = make_poems(tmp, config, args.poems, args.duration)
+
+        print(f"{args.poems} poem(s) of {args.duration:.0f}s, {config['batch']['max_poems']} at once, "
+              f"{'Veo' if args.veo else 'Imagen'}, time scale {args.time_scale}, error rate {args.error_rate}")
+        runner = BatchRunner(config, poems, run_id=RUN_ID, draft=not args.full_quality)
+        started = time.time()
+        with contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO()):
+            results = runner.run()
+        wall = time.time() - started
+        latencies = span_latencies(config["project"]["output_dir"], results)
+
+    ok = [r for r in results if r["status"] == "ok"]
+    summary = {
+        "poems": len(results),
+        "ok": len(ok),
+        "wall_s": wall,
+        "poems_per_min": len(ok) / wall * 60 if wall else 0.0,
+        "poem_latency": distribution([r["elapsed"] for r in ok]) if ok else None,
+        "failures": [{"poem": r["poem"], "step": r["failed_step"], "error": r["error"]} for r in results if r not in ok],
+        "spans": {f"{cat}/{name}": distribution(values) for (cat, name), values in sorted(latencies.items())},
+        "backend": backend_summary(),
+    }
+
+    print(f"\n{summary['ok']}/{summary['poems']} ok in {wall:.1f}s: {summary['poems_per_min']:.1f} poems/min")
+    rows = ([("poem", summary["poem_latency"])] if ok else []) + list(summary["spans"].items())
+    print(f"  {'latency (s)':36} {'n':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for name, d in rows:
+        print(f"  {name[:36]:36} {d['count']:5d} {d['p50']:8.2f} {d['p95']:8.2f} {d['p99']:8.2f} {d['max']:8.2f}")
+    for failure in summary["failures"]:
+        print(f"  FAILED {failure['poem']}: step={failure['step']} error={failure['error']}")
+    if summary["backend"]:
+        print(summary["backend"])
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump({"environment": environment(), "params": vars(args), "summary": summary}, f, indent=2)
+        print(f"Summary written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Offline stage benchmarks: segmentation, subtitles, text rendering and
+compositing on synthetic inputs. Needs only ffmpeg and Pillow; no API keys,
+models or network.
+
+    python -m benchmarks.bench_stages --output benchmarks/results/base.json
+    python -m benchmarks.bench_stages --compare benchmarks/results/base.json
+    python -m benchmarks.bench_stages --quick --stages segments,subtitles
+
+Each result has best/mean wall time, the Python heap peak (tracemalloc) and
+peak RSS of this process and of ffmpeg children. Results are written as JSON
+(default benchmarks/results/<commit>.json); --compare prints ratios against an
+earlier file and exits non-zero if anything got slower than --threshold.
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+from benchmarks.harness import compare, environment, measure, write_results
+from benchmarks.synthetic import (devanagari_lines, silent_audio, test_pattern_image, test_pattern_video,
+                                  word_timestamps)
+from src.utils.segmentation import build_segments
+from src.utils.subtitle import generate_ass, generate_srt
+from src.video.compositor import VideoCompositor
+from src.visuals.text_renderer import TextRenderer
+
+STAGES = ("segments", "subtitles", "text", "compose")
+
+
+@contextlib.contextmanager
+def quiet():
+    """The stages log per item; keep that out of the report."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def silenced(fn):
+    def run():
+        with quiet():
+            return fn()
+    return run
+
+
+def bench_config(tmp, resolution, fps=30, **sections):
+    config = {
+        "project": {"output_dir": tmp},
+        "video": {"resolution": list(resolution), "fps": fps},
+        # Cold numbers: no overlay or clip reuse between repeats
+        "cache": {"dir": os.path.join(tmp, ".cache"), "text": False, "clips": False},
+    }
+    config.update(sections)
+    return config
+
+
+def run_segments(durations, repeat):
+    results = []
+    for duration in durations:
+        words = word_timestamps(duration)
+        results.append(measure(f"build_segments {duration}s", silenced(lambda: build_segments(words, duration)),
+                               repeat=repeat, audio_s=duration, words=len(words)))
+    return results
+
+
+def run_subtitles(durations, repeat, resolution):
+    results = []
+    for duration in durations:
+        with quiet():
+            segments = build_segments(word_timestamps(duration), duration)
+        results.append(measure(f"generate_srt {duration}s", lambda: generate_srt(segments),
+                               repeat=repeat, audio_s=duration, segments=len(segments)))
+        results.append(measure(f"generate_ass {duration}s", lambda: generate_ass(segments, resolution=resolution),
+                               repeat=repeat, audio_s=duration, segments=len(segments)))
+    return results
+
+
+def run_text(tmp, line_count, repeat, resolution):
+    text_dir = os.path.join(tmp, "text")
+    os.makedirs(text_dir, exist_ok=True)
+    segments = []
+    for i, line in enumerate(devanagari_lines(line_count)):
+        segments.append({"type": "lyrics", "text": line, "start": i * 2.5, "end": i * 2.5 + 2.4,
+                         "words": [{"word": w, "start": i * 2.5 + j * 0.4, "end": i * 2.5 + j * 0.4 + 0.35}
+                                   for j, w in enumerate(line.split())]})
+
+    renderer = TextRenderer(bench_config(tmp, resolution))
+    serial = TextRenderer(bench_config(tmp, resolution, text={"render_workers": 1}))
+    first = segments[0]["text"]
+    path = os.path.join(text_dir, "single.png")
+    renderer._load_font()
+    return [
+        measure("render_text_overlay 1 line", silenced(lambda: renderer.render_text_overlay(first, path)),
+                repeat=max(repeat, 5)),
+        measure(f"render_segments {line_count} lines serial", silenced(lambda: serial.render_segments(segments, text_dir)),
+                repeat=repeat, lines=line_count, workers=1),
+        measure(f"render_segments {line_count} lines", silenced(lambda: renderer.render_segments(segments, text_dir)),
+                repeat=repeat, lines=line_count, workers=renderer.workers),
+        measure(f"render_captions {line_count} lines", silenced(lambda: renderer.render_captions(segments, text_dir)),
+                repeat=repeat, lines=line_count),
+    ]
+
+
+def compose_segments(duration):
+    with quiet():
+        segments = build_segments(word_timestamps(duration), duration)
+    for seg in segments:
+        seg["end"] = min(seg["end"], duration)
+    return segments
+
+
+def run_compose(tmp, duration, repeat, resolution, fps, text_mode):
+    """
+    create_video on one synthetic song three ways: stills through both Ken
+    Burns backends, and Veo-like clips of 2/4/8 s so the conformer trims,
+    slows and loops.
+    """
+    segments = compose_segments(duration)
+    audio_path = silent_audio(os.path.join(tmp, "audio.wav"), duration)
+    assets_dir = os.path.join(tmp, "assets", "images")
+    os.makedirs(assets_dir, exist_ok=True)
+    stills = [test_pattern_image(os.path.join(assets_dir, f"still_{i}.png"), seed=i) for i in range(4)]
+    videos = [test_pattern_video(os.path.join(assets_dir, f"veo_{s}s.mp4"), s) for s in (2, 4, 8)]
+
+    text_config = {"mode": "overlay" if text_mode == "overlay" else "karaoke"}
+    if text_mode != "none":
+        renderer = TextRenderer(bench_config(tmp, resolution, text=text_config))
+        text_dir = os.path.join(tmp, "assets", "text")
+        os.makedirs(text_dir, exist_ok=True)
+        with quiet():
+            if text_mode == "overlay":
+                for i, overlay in renderer.render_segments(segments, text_dir).items():
+                    segments[i]["text_overlay"] = overlay
+            else:
+                for i, captions in renderer.render_captions(segments, text_dir).items():
+                    segments[i]["captions"] = captions
+
+    lyric_count = sum(1 for s in segments if s["type"] in ("lyrics", "intro", "outro"))
+    cases = [
+        ("compose stills zoompan", stills, {"motion": {"backend": "zoompan"}}),
+        ("compose stills frames", stills, {"motion": {"backend": "frames"}}),
+        ("compose videos conform", videos, {}),
+    ]
+    results = []
+    for name, assets, sections in cases:
+        for i, seg in enumerate(segments):
+            seg["asset_path"] = assets[i % len(assets)]
+            seg.pop("asset_probe", None)
+        compositor = VideoCompositor(bench_config(tmp, resolution, fps=fps, text=text_config, **sections))
+        output_path = os.path.join(tmp, f"{name.replace(' ', '_')}.mp4")
+        render = silenced(lambda: compositor.create_video(segments, audio_path, output_path))
+        results.append(measure(f"{name} {duration}s", render, repeat=repeat, audio_s=duration, clips=lyric_count,
+                               resolution=f"{resolution[0]}x{resolution[1]}", fps=fps, text=text_mode,
+                               workers=compositor.render_workers))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"Comma-separated subset of {','.join(STAGES)}")
+    parser.add_argument("--durations", default="30,300,1800", help="Audio lengths (s) for segments/subtitles")
+    parser.add_argument("--lines", type=int, default=60, help="Lyric lines for the text stage")
+    parser.add_argument("--compose-duration", type=float, default=30.0, help="Audio length (s) for compose")
+    parser.add_argument("--resolution", default="1080x1920", help="Output WxH")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--text", choices=["captions", "overlay", "none"], default="captions",
+                        help="Text burned in during compose (captions needs ffmpeg with libass)")
+    parser.add_argument("--repeat", type=int, help="Runs per benchmark (default 3; compose 1)")
+    parser.add_argument("--quick", action="store_true", help="30 s inputs, 540x960 and one run each")
+    parser.add_argument("--output", help="Results JSON (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Slowdown ratio counted as a regression")
+    args = parser.parse_args()
+
+    stages = [s for s in args.stages.split(",") if s]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+    durations = [int(d) for d in args.durations.split(",")]
+    resolution = tuple(int(v) for v in args.resolution.split("x"))
+    repeat, compose_repeat = args.repeat or 3, args.repeat or 1
+    if args.quick:
+        durations, resolution, repeat, compose_repeat = [30], (540, 960), 1, 1
+        args.lines = min(args.lines, 12)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        if "segments" in stages:
+            print("Segmentation")
+            results += run_segments(durations, repeat)
+        if "subtitles" in stages:
+            print("Subtitles")
+            results += run_subtitles(durations, repeat, resolution)
+        if "text" in stages:
+            print("Text rendering")
+            results += run_text(tmp, args.lines, repeat, resolution)
+        if "compose" in stages:
+            print("Compositing")
+            results += run_compose(tmp, args.compose_duration, compose_repeat, resolution, args.fps, args.text)
+
+    output = args.output or os.path.join("benchmarks", "results", f"{environment()['commit'] or 'local'}.json")
+    print(f"\nResults written to {write_results(output, results)}")
+
+    if args.compare:
+        regressions = compare(args.compare, results, threshold=args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) slower than {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
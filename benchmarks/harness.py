@@ -0,0 +1,105 @@
+"""
+Timing / memory capture and result files for the offline benchmarks.
+"""
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+
+def _maxrss_mb(who):
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(who).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def measure(name, fn, repeat=3, **params):
+    """
+    One traced run for the Python heap peak (tracemalloc slows allocation,
+    so it doubles as the warm-up), then `repeat` timed runs. Records best/mean
+    wall time and the peak RSS of this process and of child processes
+    (ffmpeg) so far.
+    """
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    result = {
+        "name": name,
+        "params": params,
+        "repeat": repeat,
+        "best_s": min(times),
+        "mean_s": sum(times) / len(times),
+        "py_peak_mb": peak / 1e6,
+        "maxrss_mb": _maxrss_mb(resource.RUSAGE_SELF),
+        "children_maxrss_mb": _maxrss_mb(resource.RUSAGE_CHILDREN),
+    }
+    print(f"  {name:38} best {result['best_s']*1000:9.1f} ms  mean {result['mean_s']*1000:9.1f} ms  "
+          f"py peak {result['py_peak_mb']:7.1f} MB")
+    return result
+
+
+def environment():
+    """Where the numbers came from: commit, interpreter, machine."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    try:
+        ffmpeg_version = subprocess.run(["ffmpeg", "-version"], capture_output=True, text=True).stdout.split("\n")[0]
+    except OSError:
+        ffmpeg_version = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "ffmpeg": ffmpeg_version,
+    }
+
+
+def write_results(path, results):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def compare(baseline_path, results, threshold=0.10):
+    """
+    Prints best-time ratios against a previous results file; returns the
+    names that got slower by more than `threshold`.
+    """
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+    old = {r["name"]: r for r in baseline["results"]}
+    print(f"\nCompared with {baseline_path} (commit {baseline['environment'].get('commit')}):")
+    print(f"  {'benchmark':38} {'before ms':>10} {'after ms':>10} {'ratio':>7}")
+    regressions = []
+    for r in results:
+        if r["name"] not in old:
+            continue
+        before, after = old[r["name"]]["best_s"], r["best_s"]
+        ratio = after / before if before else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  SLOWER"
+            regressions.append(r["name"])
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(f"  {r['name']:38} {before*1000:10.1f} {after*1000:10.1f} {ratio:6.2f}x{flag}")
+    return regressions
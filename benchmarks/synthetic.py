@@ -0,0 +1,69 @@
+"""
+Synthetic, deterministic inputs for the offline benchmarks: word timestamps,
+Devanagari lyric lines, test-pattern stills/videos and silent audio.
+"""
+import random
+import subprocess
+
+from PIL import Image, ImageDraw
+
+# Common Hindi nursery-rhyme vocabulary, so shaping and normalization see real script
+WORDS = ["मछली", "जल", "की", "रानी", "है", "जीवन", "उसका", "पानी", "हाथ", "लगाओ", "डर", "जाएगी",
+         "बाहर", "निकालो", "मर", "चंदा", "मामा", "दूर", "के", "पुए", "पकाए", "गुड़", "थाली", "में"]
+
+
+def devanagari_lines(count, seed=0, words_per_line=(3, 7)):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(*words_per_line))) for _ in range(count)]
+
+
+def word_timestamps(duration_s, seed=0):
+    """
+    Sung-word timings covering duration_s: ~2.5 words/s in lines, short
+    pauses between lines and an occasional instrumental gap.
+    """
+    rng = random.Random(seed)
+    words = []
+    t = rng.uniform(0.5, 3.0)
+    while t < duration_s:
+        for _ in range(rng.randint(3, 7)):
+            length = rng.uniform(0.2, 0.5)
+            if t + length > duration_s:
+                break
+            words.append({"word": rng.choice(WORDS), "start": round(t, 3), "end": round(t + length, 3),
+                          "score": round(rng.uniform(0.5, 1.0), 3)})
+            t += length + rng.uniform(0.02, 0.15)
+        t += rng.uniform(0.6, 1.2) if rng.random() > 0.05 else rng.uniform(2.5, 6.0)
+    return words
+
+
+def test_pattern_image(path, size=(768, 1408), seed=0):
+    """Random colour bars under a white grid; roughly Imagen's 9:16 size by default."""
+    width, height = size
+    rng = random.Random(seed)
+    img = Image.new("RGB", size)
+    draw = ImageDraw.Draw(img)
+    bars = [(rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255)) for _ in range(8)]
+    for i, colour in enumerate(bars):
+        draw.rectangle([i * width // 8, 0, (i + 1) * width // 8, height], fill=colour)
+    for x in range(0, width, 64):
+        draw.line([(x, 0), (x, height)], fill=(255, 255, 255), width=2)
+    for y in range(0, height, 64):
+        draw.line([(0, y), (width, y)], fill=(255, 255, 255), width=2)
+    img.save(path)
+    return path
+
+
+def test_pattern_video(path, duration_s, size=(720, 1280), fps=24):
+    """Moving test pattern (ffmpeg testsrc2), H.264 like a Veo clip."""
+    width, height = size
+    subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi",
+                    "-i", f"testsrc2=size={width}x{height}:rate={fps}:duration={duration_s}",
+                    "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", path], check=True)
+    return path
+
+
+def silent_audio(path, duration_s):
+    subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi",
+                    "-i", "anullsrc=r=44100:cl=stereo", "-t", str(duration_s), path], check=True)
+    return path
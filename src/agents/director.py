@@ -2,8 +2,12 @@ import json
 from src.utils.llm import GeminiClient
 
 class DirectorAgent:
+    PROMPT_VERSION = 1
+
     def __init__(self, model_name="gemini-3-flash-preview"):
         self.llm = GeminiClient(model_name=model_name)
+        # Set when the last Style Bible is the generic fallback
+        self.used_fallback = False
 
     def create_style_bible(self, lyrics_text, style_preference):
         """
@@ -30,9 +34,11 @@ class DirectorAgent:
         """
         
         print("Director Agent: Analyzing lyrics and creating Style Bible...")
-        response_text = self.llm.generate_content(prompt, response_mime_type="application/json")
-        
+        self.used_fallback = False
+        response_text = None
         try:
+            response_text = self.llm.generate_content(prompt, response_mime_type="application/json")
+            
             # Clean up potential markdown code blocks if the model adds them (though response_mime_type should help)
             if response_text.startswith("```json"):
                 response_text = response_text[7:-3]
@@ -46,6 +52,7 @@ class DirectorAgent:
             print(f"Director Agent Error: {e}")
             print(f"Raw Response: {response_text}")
             # Fallback
+            self.used_fallback = True
             return {
                 "character": "A cute character",
                 "setting": "A colorful background",
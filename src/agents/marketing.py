@@ -2,6 +2,8 @@ from src.utils.llm import GeminiClient
 import json
 
 class MarketingAgent:
+    PROMPT_VERSION = 1
+
     def __init__(self):
         self.llm = GeminiClient()
 
@@ -2,8 +2,12 @@ import json
 from src.utils.llm import GeminiClient
 
 class ScreenwriterAgent:
+    PROMPT_VERSION = 1
+
     def __init__(self, model_name="gemini-2.0-flash-exp"):
         self.llm = GeminiClient(model_name=model_name)
+        # Set when the last call left segments without a real description
+        self.used_fallback = False
 
     def enrich_segments(self, segments, style_bible):
         """
@@ -52,9 +56,10 @@ class ScreenwriterAgent:
         }}
         """
         
-        response_text = self.llm.generate_content(prompt, response_mime_type="application/json")
-        
+        self.used_fallback = False
+        response_text = None
         try:
+            response_text = self.llm.generate_content(prompt, response_mime_type="application/json")
             data = json.loads(response_text)
             descriptions = data.get("descriptions", [])
             
@@ -67,10 +72,12 @@ class ScreenwriterAgent:
                     seg["visual_description"] = descriptions[i]
                 else:
                     seg["visual_description"] = f"Visual for: {seg.get('text', '')}"
+                    self.used_fallback = True
             
             return segments
             
         except Exception as e:
             print(f"Error parsing Screenwriter output: {e}")
             print(f"Raw response: {response_text}")
+            self.used_fallback = True
             return segments
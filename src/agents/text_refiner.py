@@ -1,14 +1,48 @@
 import json
 from src.utils.llm import GeminiClient
+from src.utils.text_align import align_words
 
 class TextRefinerAgent:
-    def __init__(self, model_name="gemini-3-flash-preview"):
-        self.llm = GeminiClient(model_name=model_name)
+    PROMPT_VERSION = 1
+
+    def __init__(self, model_name="gemini-3-flash-preview", config=None):
+        refiner_config = (config or {}).get("refiner", {})
+        self.model_name = model_name
+        self.mode = refiner_config.get("mode", "local")  # local | llm
+        self.llm_fallback = refiner_config.get("llm_fallback", True)
+        self.min_match_ratio = refiner_config.get("min_match_ratio", 0.6)
+        self._llm = None
+
+    @property
+    def llm(self):
+        # Created on demand so the local path needs no API key
+        if self._llm is None:
+            self._llm = GeminiClient(model_name=self.model_name)
+        return self._llm
 
     def refine_timestamps(self, timestamped_words, ground_truth_text):
         """
         Aligns Whisper's timestamped words with the ground truth lyrics text.
         Returns a new list of timestamped words with corrected spelling.
+        Uses the local DP aligner unless mode is 'llm'; falls back to the LLM
+        when the local match ratio is below min_match_ratio.
+        """
+        if self.mode != "llm":
+            refined, stats = align_words(timestamped_words, ground_truth_text)
+            print(f"TextRefiner: local alignment matched {stats['matched']}/{stats['lyric_tokens']} lyric words "
+                  f"({stats['interpolated']} interpolated)")
+            if refined is not None and stats["match_ratio"] >= self.min_match_ratio:
+                return refined
+            if not self.llm_fallback:
+                print("TextRefiner: low-confidence local alignment; keeping it (LLM fallback disabled).")
+                return refined if refined is not None else timestamped_words
+            print("TextRefiner: low-confidence local alignment; falling back to LLM.")
+
+        return self.refine_timestamps_llm(timestamped_words, ground_truth_text)
+
+    def refine_timestamps_llm(self, timestamped_words, ground_truth_text):
+        """
+        LLM refinement: asks Gemini to re-emit the word list with corrected spelling.
         """
         # Prepare input for LLM
         # We need to pass the JSON and the clean text and ask it to output corrected JSON
@@ -40,9 +74,9 @@ class TextRefinerAgent:
         """
         
         print("TextRefiner Agent: refining timestamps with ground truth...")
-        response_text = self.llm.generate_content(prompt, response_mime_type="application/json")
-        
         try:
+            response_text = self.llm.generate_content(prompt, response_mime_type="application/json")
+            
             # Clean up potential markdown
             if response_text.startswith("```json"):
                 response_text = response_text[7:-3]
@@ -1,8 +1,33 @@
-from src.utils.llm import GeminiClient
+import json
+from src.utils.llm import GeminiClient, LLMError
 
 class VisualizerAgent:
+    PROMPT_VERSION = 1
+
     def __init__(self, model_name="gemini-3-flash-preview"):
         self.llm = GeminiClient(model_name=model_name)
+        # Set when a prompt fell back to the bare scene description or a
+        # per-segment retry; fallback_segments holds their segment indices
+        self.used_fallback = False
+        self.fallback_segments = set()
+
+    def prompt_inputs(self, segments, i, style_bible):
+        """
+        Everything the prompt for segment i is derived from. The asset store
+        indexes assets on this too, so a re-run can reuse them without
+        regenerating (non-deterministic) prompts.
+        """
+        seg = segments[i]
+        previous_context = ""
+        if i > 0:
+            previous_context = segments[i-1].get("visual_description", segments[i-1].get("text", ""))
+        return {
+            "text": seg.get("text", ""),
+            "visual_description": seg.get("visual_description", ""),
+            "previous_scene": previous_context,
+            "style_bible": style_bible,
+            "prompt_version": self.PROMPT_VERSION,
+        }
 
     def generate_prompt(self, lyric_line, style_bible, previous_context=None, **kwargs):
         """
@@ -32,7 +57,15 @@ class VisualizerAgent:
         - Output ONLY the prompt string. do NOT wrap in quotes.
         """
         
-        response = self.llm.generate_content(prompt)
+        try:
+            response = self.llm.generate_content(prompt)
+        except LLMError as e:
+            # Fall back to the Screenwriter's description so generation can still proceed
+            print(f"Visualizer Agent Error: {e}")
+            response = visual_desc or lyric_line
+            self.used_fallback = True
+            if kwargs.get("index") is not None:
+                self.fallback_segments.add(kwargs["index"])
         
         # Combine with style suffix
         full_prompt = f"{response}, {style_suffix}"
@@ -41,3 +74,89 @@ class VisualizerAgent:
         full_prompt = full_prompt.replace("\n", " ").strip()
         
         return full_prompt
+
+    def generate_prompts(self, segments, style_bible, indices, chunk_size=20):
+        """
+        Batched variant of generate_prompt: one LLM call per chunk of segments.
+        Returns {segment_index: prompt}. Each segment still sees the previous
+        segment's description as context; anything missing from a malformed or
+        partial response falls back to a single-segment call. LLMError is raised.
+        """
+        character_desc = style_bible.get("character", "")
+        setting_desc = style_bible.get("setting", "")
+        style_suffix = style_bible.get("style_bible_suffix", "")
+        
+        prompts = {}
+        for start in range(0, len(indices), chunk_size):
+            chunk = indices[start:start + chunk_size]
+            
+            scene_lines = []
+            for i in chunk:
+                seg = segments[i]
+                previous_context = ""
+                if i > 0:
+                    previous_context = segments[i-1].get("visual_description", segments[i-1].get("text", ""))
+                scene_lines.append(json.dumps({
+                    "segment": i,
+                    "lyric_line": seg.get("text", ""),
+                    "visual_description": seg.get("visual_description", ""),
+                    "previous_scene": previous_context,
+                }, ensure_ascii=False))
+            scenes_block = "\n".join(scene_lines)
+            
+            prompt = f"""
+        You are the Visualizer for a music video.
+        
+        Context:
+        - Character: {character_desc}
+        - Setting: {setting_desc}
+        
+        Scenes (one JSON object per line):
+        {scenes_block}
+        
+        Your Job:
+        For EACH scene, write a precise image generation prompt for Google Imagen/Flux.
+        - The image MUST feature the Character in the Setting.
+        - Translate the *emotion* or *action* of the lyric line into a visual scene.
+        - Use "previous_scene" to keep continuity between consecutive scenes.
+        - Keep the character consistent.
+        
+        Output JSON format:
+        {{
+            "prompts": [
+                {{"segment": <segment number from input>, "prompt": "<prompt text, no quotes>"}}
+            ]
+        }}
+        """
+            
+            print(f"Visualizer Agent: Generating prompts for segments {chunk[0]+1}-{chunk[-1]+1}...")
+            # An LLMError (retries exhausted, quota, auth) propagates: falling back
+            # to one call per segment would only repeat the failure N times.
+            response_text = self.llm.generate_content(prompt, response_mime_type="application/json")
+            try:
+                data = json.loads(response_text)
+                for item in data.get("prompts", []):
+                    try:
+                        idx = int(item["segment"])
+                    except (TypeError, KeyError, ValueError):
+                        continue
+                    if idx in chunk and item.get("prompt"):
+                        prompts[idx] = f"{item['prompt']}, {style_suffix}".replace("\n", " ").strip()
+            except (ValueError, AttributeError) as e:
+                print(f"Visualizer Agent Error (batch): {e}")
+                print(f"Raw Response: {response_text}")
+            
+            # Per-segment fallback for anything the batch response dropped or garbled
+            for i in chunk:
+                if i not in prompts:
+                    self.used_fallback = True
+                    self.fallback_segments.add(i)
+                    seg = segments[i]
+                    previous_context = ""
+                    if i > 0:
+                        previous_context = segments[i-1].get("visual_description", segments[i-1].get("text", ""))
+                    prompts[i] = self.generate_prompt(seg.get("text", ""), style_bible, previous_context,
+                                                      visual_description=seg.get("visual_description", ""),
+                                                      index=i)
+        
+        return prompts
@@ -1,8 +1,15 @@
 import whisperx
 import json
 import os
+import numpy as np
 import torch
 
+from src.audio.models import registry
+from src.utils.text_align import interpolate_missing
+from src.utils.trace import span
+
+SAMPLE_RATE = 16000  # whisperx.load_audio resamples to 16 kHz
+
 class AudioAligner:
     def __init__(self, config):
         self.config = config
@@ -17,6 +24,126 @@ class AudioAligner:
 
         print(f"Initialized AudioAligner on device: {self.device} with compute_type: {self.compute_type}")
 
+        alignment_config = config.get("alignment", {})
+        self.mode = alignment_config.get("mode", "asr")  # asr | lyrics (opt-in)
+        self.language = alignment_config.get("language", "hi")
+        self.min_score = alignment_config.get("min_score", 0.4)
+        self.min_aligned_ratio = alignment_config.get("min_aligned_ratio", 0.8)
+        self.padding = alignment_config.get("padding", 0.5)
+
+    def align_auto(self, audio_path, lyrics_path=None):
+        """
+        Aligns using the configured mode. Returns (words, source) where source is
+        'lyrics' when the words came straight from the lyrics (no refinement
+        needed) or 'asr' when Whisper transcription was used.
+        """
+        if self.mode == "lyrics" and lyrics_path and os.path.exists(lyrics_path):
+            words = self.align_lyrics(audio_path, lyrics_path)
+            if words is not None:
+                return words, "lyrics"
+            print("Low-confidence lyrics alignment; falling back to Whisper ASR.")
+        return self.align(audio_path, lyrics_path), "asr"
+
+    def _speech_intervals(self, audio, frame_s=0.03, min_gap_s=0.3):
+        """
+        Rough energy-based VAD: (start, end) seconds of frames louder than a
+        threshold between the quiet floor and the loud ceiling of the track.
+        """
+        frame = int(SAMPLE_RATE * frame_s)
+        n_frames = len(audio) // frame
+        if n_frames == 0:
+            return []
+        rms = np.sqrt(np.mean(audio[:n_frames * frame].reshape(n_frames, frame) ** 2, axis=1))
+        floor, ceiling = np.percentile(rms, 10), np.percentile(rms, 90)
+        voiced = rms > floor + 0.3 * (ceiling - floor)
+
+        intervals = []
+        for idx in np.flatnonzero(voiced):
+            start, end = idx * frame_s, (idx + 1) * frame_s
+            if intervals and start - intervals[-1][1] <= min_gap_s:
+                intervals[-1][1] = end
+            else:
+                intervals.append([start, end])
+        return [tuple(iv) for iv in intervals]
+
+    def _line_segments(self, lines, audio):
+        """
+        Spreads lyric lines over the voiced part of the audio in proportion to
+        their length, giving each line a rough [start, end] window for wav2vec2.
+        """
+        duration = len(audio) / SAMPLE_RATE
+        intervals = self._speech_intervals(audio) or [(0.0, duration)]
+        voiced_total = sum(e - s for s, e in intervals)
+
+        def voiced_to_time(t):
+            # Map a position on the concatenated voiced timeline back to audio time
+            for s, e in intervals:
+                if t <= e - s:
+                    return s + t
+                t -= e - s
+            return intervals[-1][1]
+
+        weights = [max(len(line), 1) for line in lines]
+        total = float(sum(weights))
+        segments = []
+        acc = 0.0
+        for line, w in zip(lines, weights):
+            start = voiced_to_time(voiced_total * acc / total)
+            acc += w
+            end = voiced_to_time(voiced_total * acc / total)
+            segments.append({
+                "text": line,
+                "start": max(0.0, start - self.padding),
+                "end": min(duration, end + self.padding),
+            })
+        return segments
+
+    def align_lyrics(self, audio_path, lyrics_path):
+        """
+        Forced alignment of the known lyrics, skipping Whisper transcription.
+        Builds one segment per lyric line (timed from VAD) and runs only the
+        wav2vec2 alignment model. Returns None if the result is low confidence.
+        """
+        if not os.path.exists(audio_path):
+            raise FileNotFoundError(f"Audio file not found: {audio_path}")
+
+        with open(lyrics_path, "r", encoding="utf-8") as f:
+            lines = [line.strip() for line in f if line.strip()]
+        if not lines:
+            return None
+
+        print(f"Loading audio: {audio_path}")
+        audio = whisperx.load_audio(audio_path)
+        segments = self._line_segments(lines, audio)
+
+        model_a, metadata = registry.get_align_model(self.language, self.device)
+        print(f"Aligning {len(lines)} lyric lines (no ASR)...")
+        with span("wav2vec2 align", cat="audio", audio_s=round(len(audio) / SAMPLE_RATE, 2), lines=len(lines)):
+            result = whisperx.align(segments, model_a, metadata, audio, self.device, return_char_alignments=False)
+
+        words = []
+        for segment in result["segments"]:
+            for word in segment.get("words", []):
+                words.append({
+                    "word": word["word"],
+                    "start": word.get("start"),
+                    "end": word.get("end"),
+                    "score": word.get("score", 0),
+                })
+        if not words:
+            return None
+
+        aligned = [w for w in words if w["start"] is not None]
+        aligned_ratio = len(aligned) / len(words)
+        mean_score = sum(w["score"] for w in aligned) / len(aligned) if aligned else 0.0
+        print(f"Lyrics alignment: {len(aligned)}/{len(words)} words aligned, mean score {mean_score:.2f}")
+        if aligned_ratio < self.min_aligned_ratio or mean_score < self.min_score:
+            return None
+
+        # Words wav2vec2 could not place (digits, symbols) get neighbour-interpolated times
+        interpolate_missing(words)
+        return words
+
     def align(self, audio_path, lyrics_path=None):
         """
         Transcribes and aligns audio. 
@@ -31,22 +158,23 @@ class AudioAligner:
         audio = whisperx.load_audio(audio_path)
 
         # 1. Transcribe
-        print("Loading Whisper model...")
         # Using medium model by default for speed/accuracy trade-off, configurable
         # Fix: Read from nested 'whisper' config
+        # Models come from the process-wide registry, so they load once per process.
         whisper_config = self.config.get("whisper", {})
         model_size = whisper_config.get("model", "medium") if isinstance(whisper_config, dict) else "medium"
-        model = whisperx.load_model(model_size, self.device, compute_type=self.compute_type)
+        model = registry.get_asr_model(model_size, self.device, self.compute_type)
         
         print("Transcribing...")
-        result = model.transcribe(audio, batch_size=16)
+        with span("whisper transcribe", cat="audio", model=model_size, audio_s=round(len(audio) / SAMPLE_RATE, 2)):
+            result = model.transcribe(audio, batch_size=16)
         
         # 2. Align
-        print("Loading Alignment model...")
-        model_a, metadata = whisperx.load_align_model(language_code=result["language"], device=self.device)
+        model_a, metadata = registry.get_align_model(result["language"], self.device)
         
         print("Aligning...")
-        result = whisperx.align(result["segments"], model_a, metadata, audio, self.device, return_char_alignments=False)
+        with span("wav2vec2 align", cat="audio", audio_s=round(len(audio) / SAMPLE_RATE, 2)):
+            result = whisperx.align(result["segments"], model_a, metadata, audio, self.device, return_char_alignments=False)
         
         # 3. Process output to flat word list with timestamps
         aligned_words = []
@@ -0,0 +1,109 @@
+import contextlib
+import gc
+import threading
+
+from src.utils.trace import span
+
+# torch and whisperx are imported on first use: loading them takes seconds and
+# hundreds of MB, and most steps never align audio.
+
+_torch_load_lock = threading.Lock()
+_torch_load_depth = 0
+_original_torch_load = None
+
+
+@contextlib.contextmanager
+def legacy_torch_load():
+    """
+    Within the block, torch.load runs with weights_only=False. PyTorch 2.6+
+    defaults to weights_only=True, which rejects the pickled WhisperX/Pyannote
+    checkpoints; the override is limited to model loading instead of being
+    installed process-wide. Reentrant and safe across threads.
+    """
+    global _torch_load_depth, _original_torch_load
+    import torch
+
+    with _torch_load_lock:
+        if _torch_load_depth == 0:
+            _original_torch_load = torch.load
+            original = _original_torch_load
+
+            def _load(*args, **kwargs):
+                # FORCE weights_only to False to override library defaults
+                kwargs['weights_only'] = False
+                return original(*args, **kwargs)
+            torch.load = _load
+        _torch_load_depth += 1
+    try:
+        yield
+    finally:
+        with _torch_load_lock:
+            _torch_load_depth -= 1
+            if _torch_load_depth == 0:
+                torch.load = _original_torch_load
+
+
+class ModelRegistry:
+    """
+    Process-level cache of loaded WhisperX models.
+
+    ASR models are keyed by (size, device, compute_type) and alignment models by
+    (language, device), so only the first poem in a process pays the load time.
+    Call release() to drop them before memory-hungry stages such as rendering.
+    """
+
+    def __init__(self):
+        self._asr = {}
+        self._align = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get_asr_model(self, size, device, compute_type):
+        key = ("asr", size, device, compute_type)
+        with self._key_lock(key):
+            if key not in self._asr:
+                import whisperx
+                print(f"Loading Whisper model ({size}, {device}, {compute_type})...")
+                with span("load whisper model", cat="model", size=size, device=device), legacy_torch_load():
+                    self._asr[key] = whisperx.load_model(size, device, compute_type=compute_type)
+            return self._asr[key]
+
+    def get_align_model(self, language, device):
+        """Returns (model, metadata) for language."""
+        key = ("align", language, device)
+        with self._key_lock(key):
+            if key not in self._align:
+                import whisperx
+                print(f"Loading Alignment model ({language}, {device})...")
+                with span("load align model", cat="model", language=language, device=device), legacy_torch_load():
+                    self._align[key] = whisperx.load_align_model(language_code=language, device=device)
+            return self._align[key]
+
+    def loaded(self):
+        with self._lock:
+            return list(self._asr) + list(self._align)
+
+    def release(self):
+        """Drops every cached model and returns GPU/CPU memory to the system."""
+        with self._lock:
+            if not self._asr and not self._align:
+                return
+            count = len(self._asr) + len(self._align)
+            self._asr.clear()
+            self._align.clear()
+        gc.collect()
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        print(f"Released {count} alignment model(s).")
+
+
+registry = ModelRegistry()
+
+
+def release_models():
+    registry.release()
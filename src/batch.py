@@ -0,0 +1,198 @@
+import contextlib
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+import yaml
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from src.pipeline import STEPS, PoemRun, apply_overrides, load_config
+from src.audio.models import release_models
+from src.utils.llm import backend_summary as llm_backend_summary
+from src.utils.llm import cache_summary as llm_cache_summary
+from src.utils.llm import configure as configure_llm
+
+AUDIO_EXTS = [".wav", ".mp3", ".m4a", ".flac", ".ogg"]
+
+# Steps share a stage (and its concurrency limit) when they compete for the same resource.
+STAGE_OF_STEP = {
+    "align": "align",        # Whisper on CPU/GPU
+    "segment": "cpu",
+    "direct": "llm",         # Gemini
+    "metadata": "llm",
+    "screenwrite": "llm",
+    "visualize": "generate", # Veo/Imagen quota
+    "render": "render",      # Pillow + ffmpeg
+    "compose": "render",
+}
+DEFAULT_STAGE_LIMITS = {"align": 1, "cpu": 4, "llm": 4, "generate": 2, "render": 1}
+
+
+def discover_poems(source):
+    """
+    Lists poems from a directory (each <name>.txt with a matching audio file)
+    or from a YAML/JSON manifest: a list (or {"poems": [...]}) of entries with
+    `lyrics`, `audio` and optional `subject` / `run_id`. Relative manifest
+    paths are resolved against the manifest's directory.
+    """
+    poems = []
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            stem, ext = os.path.splitext(name)
+            if ext != ".txt":
+                continue
+            audio = next((os.path.join(source, stem + a) for a in AUDIO_EXTS
+                          if os.path.exists(os.path.join(source, stem + a))), None)
+            if not audio:
+                click.echo(f"Warning: No audio found for {name}; skipping.")
+                continue
+            poems.append({"lyrics": os.path.join(source, name), "audio": audio})
+        return poems
+
+    with open(source, "r") as f:
+        manifest = yaml.safe_load(f)  # JSON is valid YAML
+    entries = manifest.get("poems", []) if isinstance(manifest, dict) else (manifest or [])
+    base_dir = os.path.dirname(os.path.abspath(source))
+    for entry in entries:
+        entry = dict(entry)
+        for key in ("lyrics", "audio"):
+            if entry.get(key) and not os.path.isabs(entry[key]):
+                entry[key] = os.path.join(base_dir, entry[key])
+        poems.append(entry)
+    return poems
+
+
+class BatchRunner:
+    """
+    Runs many poems through the pipeline concurrently.
+
+    Every poem gets its own thread; each step holds a semaphore for its stage
+    (see STAGE_OF_STEP), so poem B can align while poem A waits on Veo and
+    poem C composes, without oversubscribing any one resource.
+    """
+
+    def __init__(self, config, poems, step="all", run_id=None, force=False, draft=False):
+        self.config = config
+        self.poems = poems
+        self.step = step
+        self.run_id = run_id
+        self.force = force
+        self.draft = draft
+
+        batch_config = config.get("batch", {})
+        limits = dict(DEFAULT_STAGE_LIMITS)
+        limits.update(batch_config.get("stages") or {})
+        self.stage_limits = limits
+        self.semaphores = {stage: threading.BoundedSemaphore(max(1, n)) for stage, n in limits.items()}
+        self.max_poems = batch_config.get("max_poems") or len(poems) or 1
+
+        # Alignment models are shared; release them once every poem is past alignment.
+        self._align_pending = len(poems)
+        self._align_lock = threading.Lock()
+
+    def _align_done(self, state):
+        if state.get("align_done"):
+            return
+        state["align_done"] = True
+        with self._align_lock:
+            self._align_pending -= 1
+            last = self._align_pending == 0
+        if last:
+            release_models()
+
+    def _gate(self, state):
+        @contextlib.contextmanager
+        def gate(step):
+            with self.semaphores[STAGE_OF_STEP[step]]:
+                yield
+            if step == "align":
+                self._align_done(state)
+        return gate
+
+    def _run_one(self, poem):
+        name = os.path.splitext(os.path.basename(poem.get("lyrics") or "poem"))[0]
+        log = lambda msg: click.echo(f"[{name}] {msg}")
+        result = {"poem": name, "status": "failed", "failed_step": None, "error": None, "elapsed": 0.0, "output": None}
+        state = {}
+        started = time.time()
+        try:
+            # Setup failures (bad manifest entry, unwritable output dir) fail this poem only
+            config = apply_overrides(self.config, poem.get("audio"), poem.get("lyrics"), poem.get("subject"), log=log)
+            run = PoemRun(config, run_id=poem.get("run_id") or self.run_id, force=self.force,
+                          log=log, release_after_align=False, draft=self.draft)
+        except Exception as e:
+            traceback.print_exc()
+            result["error"] = f"{type(e).__name__}: {e}"
+            self._align_done(state)
+            result["elapsed"] = time.time() - started
+            return result
+        try:
+            try:
+                ok = run.run(self.step, gate=self._gate(state))
+            except Exception as e:
+                traceback.print_exc()
+                ok = False
+            result.update(
+                status="ok" if ok else "failed",
+                failed_step=run.failed_step,
+                error=run.error,
+                output=run.final_output_path if ok and os.path.exists(run.final_output_path) else None,
+            )
+        finally:
+            self._align_done(state)
+            result["elapsed"] = time.time() - started
+        return result
+
+    def run(self):
+        click.echo(f"Batch: {len(self.poems)} poem(s), up to {self.max_poems} at once, stage limits {self.stage_limits}")
+        with ThreadPoolExecutor(max_workers=self.max_poems) as pool:
+            results = list(pool.map(self._run_one, self.poems))
+        release_models()
+        return results
+
+
+def print_summary(results):
+    click.echo("\n=== Batch Summary ===")
+    for r in results:
+        detail = r["output"] or ""
+        if r["status"] != "ok":
+            detail = f"step={r['failed_step'] or '-'} error={r['error'] or 'see log'}"
+        click.echo(f"  {r['status'].upper():6} {r['poem']:30} {r['elapsed']:7.1f}s  {detail}")
+    ok = sum(1 for r in results if r["status"] == "ok")
+    click.echo(f"{ok}/{len(results)} poem(s) succeeded.")
+
+
+@click.command()
+@click.argument('source')
+@click.option('--config', 'config_path', default='config.yaml', help='Path to config file')
+@click.option('--step', type=click.Choice(['all'] + STEPS), default='all', help='Execute specific step')
+@click.option('--run-id', default=None, help='Run ID shared by every poem (default: timestamp)')
+@click.option('--force', is_flag=True, help='Force re-execution of steps even if artifacts exist')
+@click.option('--no-llm-cache', 'no_llm_cache', is_flag=True, help='Bypass the persistent LLM response cache')
+@click.option('--draft', is_flag=True, help='Compose fast low-resolution previews')
+def main(source, config_path, step, run_id, force, no_llm_cache, draft):
+    """
+    RhymeSync batch mode: run every poem in a directory or manifest, pipelined.
+    """
+    config = load_config(config_path) if os.path.exists(config_path) else {"project": {"output_dir": "output"}}
+    configure_llm(config, bypass_cache=no_llm_cache)
+
+    poems = discover_poems(source)
+    if not poems:
+        click.echo(f"No poems found in {source}")
+        return
+
+    results = BatchRunner(config, poems, step=step, run_id=run_id, force=force, draft=draft).run()
+    print_summary(results)
+    if llm_cache_summary():
+        click.echo(llm_cache_summary())
+    if llm_backend_summary():
+        click.echo(llm_backend_summary())
+
+if __name__ == "__main__":
+    main()
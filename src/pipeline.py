@@ -0,0 +1,713 @@
+import contextlib
+import copy
+import datetime
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import click
+import ffmpeg
+import yaml
+
+# Heavy stage-specific modules (whisperx/torch for alignment, the GenAI SDK and
+# Pillow for generation, ffmpeg/numpy compositing) are imported inside the step
+# that needs them, so short steps like render or compose start quickly.
+from src.audio.models import release_models
+from src.agents.director import DirectorAgent
+from src.agents.visualizer import VisualizerAgent
+from src.visuals.scheduler import VideoJob, VideoJobScheduler
+from src.utils.file_cache import hash_file, hash_key
+from src.utils.segmentation import SEGMENTATION_VERSION, build_segments
+from src.utils.step_state import StepState
+from src.utils.trace import Trace, activate, bind, span
+from src.utils.dedup import mark_repeats
+from src.utils.subtitle import generate_ass, generate_srt
+from src.agents.marketing import MarketingAgent
+from src.agents.screenwriter import ScreenwriterAgent
+from src.agents.text_refiner import TextRefinerAgent
+
+STEPS = ['align', 'direct', 'metadata', 'segment', 'screenwrite', 'visualize', 'render', 'compose']
+
+# Upstream steps: each step starts once these finish, and their output
+# digests feed its fingerprint. Steps without a path between them run concurrently.
+STEP_DEPS = {
+    'align': [],
+    'direct': [],
+    'metadata': [],
+    'segment': ['align'],
+    'screenwrite': ['segment', 'direct'],
+    'visualize': ['screenwrite', 'direct'],
+    'render': ['segment'],
+    'compose': ['visualize', 'render'],
+}
+
+
+def load_config(config_path):
+    with open(config_path, 'r') as f:
+        return yaml.safe_load(f)
+
+
+def apply_overrides(config, audio=None, lyrics=None, subject=None, log=click.echo):
+    """Returns a copy of config with CLI/manifest input overrides applied."""
+    config = copy.deepcopy(config)
+    if audio:
+        config.setdefault('audio', {})['audio_input_file'] = audio
+        log(f"Override: Audio = {audio}")
+    if lyrics:
+        config.setdefault('audio', {})['lyrics_file'] = lyrics
+        log(f"Override: Lyrics = {lyrics}")
+    if subject:
+        config['subject'] = subject
+        log(f"Override: Subject = {subject}")
+    return config
+
+
+class PoemRun:
+    """
+    One poem's pass through the pipeline, with its artifacts under
+    <output_dir>/<poem_name>/<run_id>/.
+
+    Each step is a method; run() executes the STEP_DEPS graph, starting each
+    step as soon as its upstream steps finish (so alignment, the Director
+    and metadata overlap), and skipping steps whose input fingerprint matches
+    the one recorded in state.json (see StepState). `gate(step)` may return a
+    context manager that is held while the step runs, which the batch runner
+    uses to bound per-stage concurrency across poems.
+    """
+
+    def __init__(self, config, run_id=None, force=False, log=click.echo, release_after_align=True, draft=False):
+        self.config = config
+        self.force = force
+        self.draft = draft
+        self.log = log
+        self.release_after_align = release_after_align
+
+        self.audio_file = config.get('audio', {}).get('audio_input_file')
+        self.lyrics_file = config.get('audio', {}).get('lyrics_file')
+
+        # Derive poem name
+        self.poem_name = os.path.splitext(os.path.basename(self.lyrics_file or "poem"))[0]
+
+        # Generate Run ID
+        self.run_id = run_id or datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        base_output_dir = config.get("project", {}).get("output_dir", "output")
+        self.output_dir = os.path.join(base_output_dir, self.poem_name, self.run_id)
+
+        # Persistent State Paths
+        self.timestamps_path = os.path.join(self.output_dir, "timestamps.json")
+        self.style_bible_path = os.path.join(self.output_dir, "style_bible.json")
+        self.segments_path = os.path.join(self.output_dir, "segments.json")
+        # Drafts get their own file so a preview never stands in for the final video
+        self.final_output_path = os.path.join(self.output_dir, f"{self.poem_name}_draft.mp4" if draft else f"{self.poem_name}.mp4")
+        self.metadata_path = os.path.join(self.output_dir, f"{self.poem_name}_metadata.txt")
+        self.state = StepState(os.path.join(self.output_dir, "state.json"))
+        # Why each step is running: 'forced', 'changed' or 'new'
+        self.rerun_reasons = {}
+        self.max_parallel_steps = config.get("pipeline", {}).get("max_parallel_steps", 3)
+        # Concurrent steps each own different segments.json fields; writes are merged under this lock
+        self._segments_lock = threading.Lock()
+
+        # Outcome, filled in by run()
+        self.failed_step = None
+        self.error = None
+        self.step_times = {}
+        # Steps that completed on fallback output: kept for this run, retried on the next
+        self.provisional = set()
+        # Spans/counters for this run, exported to trace.json (Chrome trace / Perfetto)
+        self.trace = Trace(f"{self.poem_name} {self.run_id}") if config.get("trace", {}).get("enabled", True) else None
+
+    def validate(self):
+        # Paths & Validation
+        if not self.audio_file or not os.path.exists(self.audio_file):
+            self.error = f"Audio file not found: {self.audio_file}"
+            self.log(f"Error: {self.error}")
+            return False
+        if not self.lyrics_file or not os.path.exists(self.lyrics_file):
+            self.error = f"Lyrics file not found: {self.lyrics_file}"
+            self.log(f"Error: {self.error}")
+            return False
+        return True
+
+    def prepare(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        self.log(f"Run ID: {self.run_id}")
+        self.log(f"Output Directory: {self.output_dir}")
+
+        # Save Effective Config
+        with open(os.path.join(self.output_dir, "run_config.yaml"), "w") as f:
+            yaml.dump(self.config, f)
+
+        # Ensure dirs
+        os.makedirs(os.path.join(self.output_dir, "assets", "images"), exist_ok=True)
+        os.makedirs(os.path.join(self.output_dir, "assets", "text"), exist_ok=True)
+
+    def run(self, step='all', gate=None):
+        """
+        Runs the selected step (or all of them). Returns True on success; on
+        failure failed_step/error describe what went wrong.
+        """
+        if not self.validate():
+            return False
+        self.prepare()
+
+        if self.trace is None:
+            return self._run(step, gate)
+        with activate(self.trace):
+            try:
+                return self._run(step, gate)
+            finally:
+                trace_path = self.trace.export(os.path.join(self.output_dir, "trace.json"))
+                self.log(self.trace.summary())
+                self.log(f"Trace written to {trace_path} (open in ui.perfetto.dev or chrome://tracing)")
+
+    def _run(self, step, gate):
+        selected = STEPS if step == 'all' else [step]
+        if len(selected) == 1:
+            return self._execute(selected[0], gate)
+
+        pending = list(selected)
+        done = set()
+        running = {}
+        ok = True
+        error = None
+        with ThreadPoolExecutor(max_workers=max(1, self.max_parallel_steps)) as pool:
+            while pending or running:
+                # Start every step whose upstream steps have finished (none after a failure)
+                if ok:
+                    for name in list(pending):
+                        if all(dep in done for dep in STEP_DEPS[name] if dep in selected):
+                            pending.remove(name)
+                            running[pool.submit(bind(self._execute), name, gate)] = name
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        step_ok = future.result()
+                    except Exception as e:
+                        step_ok = False
+                        error = error or e
+                    if step_ok:
+                        done.add(name)
+                    else:
+                        ok = False
+        if error:
+            raise error
+        return ok
+
+    def _execute(self, name, gate=None):
+        """Runs one step unless it is up to date; returns False on failure."""
+        inputs = self.step_inputs(name)
+        status = self.state.status(name, inputs, self.step_artifacts(name))
+        if status == "fresh" and not self.force:
+            self.log(f"Skipping {name} (up to date)")
+            return True
+        self.rerun_reasons[name] = "forced" if self.force else status
+
+        started = time.time()
+        with (gate(name) if gate else contextlib.nullcontext()), \
+                span(name, cat="step", reason=self.rerun_reasons[name]):
+            try:
+                ok = getattr(self, f"step_{name}")()
+            except Exception as e:
+                self.failed_step = self.failed_step or name
+                self.error = self.error or f"{type(e).__name__}: {e}"
+                self.state.invalidate(name)
+                raise
+        self.step_times[name] = time.time() - started
+
+        if ok is False:
+            self.failed_step = self.failed_step or name
+            self.state.invalidate(name)
+            return False
+        if name in self.provisional:
+            self.state.invalidate(name)
+        else:
+            self.state.record(name, inputs, self.step_output(name))
+
+        # Alignment models are no longer needed; free their memory for rendering.
+        if name == 'align' and self.release_after_align:
+            release_models()
+        return True
+
+    # --- Incremental execution ---
+    def step_inputs(self, name):
+        """
+        Fingerprint of everything step `name` reads: input files, the config
+        sections it uses, prompt/code versions and upstream output digests.
+        """
+        config = self.config
+        upstream = {dep: self.state.output(dep) for dep in STEP_DEPS[name]}
+        if name == 'align':
+            inputs = {
+                "audio": hash_file(self.audio_file),
+                "lyrics": hash_file(self.lyrics_file),
+                "whisper": config.get("whisper"),
+                "alignment": config.get("alignment"),
+                "refiner": config.get("refiner"),
+                "refiner_prompt": TextRefinerAgent.PROMPT_VERSION,
+            }
+        elif name == 'direct':
+            inputs = {
+                "lyrics": hash_file(self.lyrics_file),
+                "subject": config.get("subject"),
+                "prompt": DirectorAgent.PROMPT_VERSION,
+            }
+        elif name == 'segment':
+            inputs = {"audio": hash_file(self.audio_file), "version": SEGMENTATION_VERSION}
+        elif name == 'screenwrite':
+            inputs = {"prompt": ScreenwriterAgent.PROMPT_VERSION}
+        elif name == 'visualize':
+            # Only settings that change the assets: concurrency, polling and
+            # timeouts don't, and shouldn't force a regeneration
+            veo_config = config.get("veo", {})
+            inputs = {
+                "veo": {"enabled": veo_config.get("enabled", False), "model": veo_config.get("model")},
+                "image_model": config.get("image_gen", {}).get("model"),
+                "batch_prompts": config.get("visualizer", {}).get("batch", True),
+                "dedup": config.get("dedup"),
+                "prompt": VisualizerAgent.PROMPT_VERSION,
+            }
+        elif name == 'render':
+            from src.visuals.text_renderer import OVERLAY_VERSION
+            inputs = {
+                "text": config.get("text"),
+                "resolution": config.get("video", {}).get("resolution"),
+                "overlay": OVERLAY_VERSION,
+            }
+        elif name == 'metadata':
+            inputs = {
+                "lyrics": hash_file(self.lyrics_file),
+                "subject": config.get("subject"),
+                "prompt": MarketingAgent.PROMPT_VERSION,
+            }
+        else:  # compose
+            inputs = {
+                "audio": hash_file(self.audio_file),
+                "video": config.get("video"),
+                "motion": config.get("motion"),
+                "conform": config.get("conform"),
+                "encoders": config.get("encoders"),
+                "draft": config.get("draft") if self.draft else False,
+            }
+        inputs["upstream"] = upstream
+        return inputs
+
+    def step_artifacts(self, name):
+        """Files that must exist for step `name` to count as done."""
+        return {
+            'align': [self.timestamps_path],
+            'direct': [self.style_bible_path],
+            'segment': [self.segments_path],
+            'screenwrite': [self.segments_path],
+            'visualize': [self.segments_path],
+            'render': [self.segments_path],
+            'compose': [self.final_output_path],
+            'metadata': [self.metadata_path],
+        }[name]
+
+    def step_output(self, name):
+        """
+        Digest of what step `name` contributed. Steps sharing segments.json
+        digest only the fields they own, so re-rendering text does not
+        invalidate the generated assets.
+        """
+        if name == 'align':
+            return hash_file(self.timestamps_path)
+        if name == 'direct':
+            return hash_file(self.style_bible_path)
+        if name == 'compose':
+            return hash_file(self.final_output_path)
+        if name == 'metadata':
+            # Missing after a failed (non-fatal) call; the next run retries it
+            return hash_file(self.metadata_path) if os.path.exists(self.metadata_path) else None
+
+        segments = self._load_segments()
+        if name == 'segment':
+            # segments.json is rebuilt from scratch here, dropping every
+            # downstream field, so dependents must re-run even when the
+            # boundaries come out identical.
+            return hash_key(hash_file(self.segments_path), time.time())
+        if name == 'screenwrite':
+            return hash_key([seg.get("visual_description") for seg in segments])
+        if name == 'render':
+            digest = lambda record: hash_file(record["path"]) if os.path.exists(record["path"]) else None
+            return hash_key([
+                [digest(seg["text_overlay"]), seg["text_overlay"]["x"], seg["text_overlay"]["y"]] if seg.get("text_overlay")
+                else digest(seg["captions"]) if seg.get("captions") else None
+                for seg in segments
+            ])
+        field = "asset_path"
+        return hash_key([
+            hash_file(seg[field]) if seg.get(field) and os.path.exists(seg[field]) else None
+            for seg in segments
+        ])
+
+    def _read_lyrics(self):
+        with open(self.lyrics_file, "r") as f:
+            return f.read()
+
+    def _load_json(self, path):
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def _write_json(self, path, data):
+        """Writes via a temp file and rename, so readers never see a half-written file."""
+        tmp = f"{path}.tmp{threading.get_ident()}"
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, path)
+
+    def _load_segments(self):
+        # Concurrent steps merge into segments.json; read a consistent snapshot
+        with self._segments_lock:
+            return self._load_json(self.segments_path)
+
+    def _save_segments(self, segments):
+        with self._segments_lock:
+            self._write_json(self.segments_path, segments)
+
+    def _merge_segments(self, segments, fields):
+        """
+        Writes only `fields` of each segment back to segments.json, so steps
+        running concurrently don't overwrite each other's additions.
+        """
+        with self._segments_lock:
+            current = self._load_json(self.segments_path)
+            for cur, seg in zip(current, segments):
+                for field in fields:
+                    if field in seg:
+                        cur[field] = seg[field]
+                    else:
+                        cur.pop(field, None)
+            self._write_json(self.segments_path, current)
+
+    def _fail(self, message):
+        self.error = message
+        self.log(message)
+        return False
+
+    # --- Step 1: Align ---
+    def step_align(self):
+        self.log("--- Step 1: Audio Alignment ---")
+        from src.audio.aligner import AudioAligner
+        aligner = AudioAligner(self.config)
+        aligned_data, source = aligner.align_auto(self.audio_file, self.lyrics_file)
+        aligner.save_timestamps(aligned_data, self.timestamps_path)
+
+        # --- Step 1-B: Refine Text ---
+        if source == "lyrics":
+            self.log("Words come from the lyrics; skipping text refinement.")
+        elif os.path.exists(self.lyrics_file):
+            self.log("--- Step 1-B: Text Refinement ---")
+            lyrics_text = self._read_lyrics()
+
+            refiner = TextRefinerAgent(config=self.config)
+            refined_data = refiner.refine_timestamps(aligned_data, lyrics_text)
+
+            # Overwrite timestamps with refined version
+            aligner.save_timestamps(refined_data, self.timestamps_path)
+        else:
+            self.log("No lyrics file found for refinement. Using raw ASR.")
+        return True
+
+    # --- Step 2: Director ---
+    def step_direct(self):
+        self.log("--- Step 2: The Director ---")
+        if not os.path.exists(self.lyrics_file):
+            return self._fail(f"Lyrics file not found: {self.lyrics_file}")
+
+        lyrics_text = self._read_lyrics()
+
+        director = DirectorAgent()
+        style_bible = director.create_style_bible(lyrics_text, self.config.get("subject", "A music video"))
+
+        with open(self.style_bible_path, "w") as f:
+            json.dump(style_bible, f, indent=2)
+        if director.used_fallback:
+            self.log("Director fell back to a generic Style Bible; it will be retried on the next run.")
+            self.provisional.add('direct')
+        return True
+
+    # --- Step 1.5: Segmentation (Intro/Outro & Grouping) ---
+    def step_segment(self):
+        self.log("--- Step 1.5: Segmentation ---")
+        if not os.path.exists(self.timestamps_path):
+            return self._fail("Timestamps not found. Run 'align' first.")
+
+        try:
+            probe = ffmpeg.probe(self.audio_file)
+            audio_duration = float(probe['format']['duration'])
+        except Exception as e:
+            self.log(f"Warning: Could not probe audio duration: {e}. Defaulting to last timestamp + 5s.")
+            audio_duration = None
+
+        timestamps = self._load_json(self.timestamps_path)
+        segments = build_segments(timestamps, audio_duration)
+        self._save_segments(segments)
+        return True
+
+    # --- Step 2.5: Screenwriter (Enrich Segments) ---
+    def step_screenwrite(self):
+        self.log("--- Step 2.5: The Screenwriter ---")
+
+        if not os.path.exists(self.segments_path):
+            return self._fail("Segments not found. Run 'segment' step first.")
+        if not os.path.exists(self.style_bible_path):
+            return self._fail("Style Bible not found. Run 'direct' step first.")
+
+        segments = self._load_segments()
+        style_bible = self._load_json(self.style_bible_path)
+
+        screenwriter = ScreenwriterAgent()
+        self.log("Screenwriter Agent: Interpreting lyrics into visual scenes...")
+        enriched_segments = screenwriter.enrich_segments(segments, style_bible)
+
+        self._merge_segments(enriched_segments, ["visual_description"])
+        if screenwriter.used_fallback:
+            self.log("Screenwriter output incomplete; it will be retried on the next run.")
+            self.provisional.add('screenwrite')
+        else:
+            self.log("Segments enriched with visual descriptions.")
+        return True
+
+    # --- Step 3: Visualizer (Images) ---
+    def step_visualize(self):
+        self.log("--- Step 3: The Visualizer & Generator ---")
+        from src.visuals.generator import ImageGenerator, asset_store
+        config = self.config
+
+        if not os.path.exists(self.segments_path):
+            return self._fail("Segments not found. Run 'segment' step first.")
+        if not os.path.exists(self.style_bible_path):
+            return self._fail("Style Bible not found. Run 'direct' step first.")
+
+        segments = self._load_segments()
+        style_bible = self._load_json(self.style_bible_path)
+
+        visualizer = VisualizerAgent()
+
+        # Determine if Veo is enabled
+        use_veo = config.get("veo", {}).get("enabled", False)
+        veo_model = config.get("veo", {}).get("model", "veo-2.0-generate-001")
+
+        # Create output directory for assets
+        images_dir = os.path.join(self.output_dir, "assets", "images")
+        os.makedirs(images_dir, exist_ok=True)
+
+        if use_veo:
+            self.log(f"Using Veo for VIDEO generation ({veo_model})")
+            generator = ImageGenerator(model_name=veo_model, store=asset_store(config)) # ImageGenerator is a misnomer here, it handles video too
+            ext = "mp4"
+        else:
+            self.log(f"Using Imagen for IMAGE generation ({config.get('image_gen', {}).get('model', 'imagen-2')})")
+            generator = ImageGenerator(model_name=config.get('image_gen', {}).get('model', 'imagen-2'), store=asset_store(config))
+            ext = "png"
+
+        # Repeated lines (choruses) reuse the first occurrence's asset
+        dedup_config = config.get("dedup", {})
+        if dedup_config.get("enabled", True):
+            reused = mark_repeats(segments, match=dedup_config.get("match", "normalized"),
+                                  match_visual=dedup_config.get("match_visual", False),
+                                  variations=dedup_config.get("variations") or [])
+            if reused:
+                self.log(f"Reusing assets for {reused} repeated segment(s)")
+        else:
+            for seg in segments:
+                seg.pop("reuse_of", None)
+                seg.pop("variation", None)
+
+        # 1. Decide which segments need a new asset
+        todo = []
+        for i, seg in enumerate(segments):
+            if seg["type"] not in ["lyrics", "intro", "outro"]:
+                continue
+            if "reuse_of" in seg:
+                continue
+
+            asset_name = f"scene_{i:03d}.{ext}"
+            asset_path = os.path.join(images_dir, asset_name)
+
+            # Store asset path in segment for compositor
+            seg["asset_path"] = asset_path
+
+            # Resume a partial first run by keeping assets that already exist (unless
+            # made from a fallback prompt); when the inputs changed (or --force),
+            # everything is regenerated.
+            if self.rerun_reasons.get('visualize') == "new" and os.path.exists(asset_path) \
+                    and not seg.get("fallback_prompt"):
+                self.log(f"Skipping Segment {i+1} (Exists)")
+                continue
+            todo.append(i)
+
+        # 2. Assets an earlier run made from the same prompt inputs (any run id):
+        # linked from the store without a prompt or generation call
+        sources = {i: visualizer.prompt_inputs(segments, i, style_bible) for i in todo}
+        stored = [i for i in todo if generator.fetch_stored_source(sources[i], segments[i]["asset_path"], video=use_veo)]
+        if stored:
+            self.log(f"Reused {len(stored)} stored asset(s) with unchanged prompt inputs")
+            for i in stored:
+                segments[i].pop("fallback_prompt", None)
+            todo = [i for i in todo if i not in stored]
+
+        # 3. Prompt engineering: one batched LLM call per chunk, or one call per segment
+        visualizer_config = config.get("visualizer", {})
+        if todo and visualizer_config.get("batch", True):
+            prompts = visualizer.generate_prompts(segments, style_bible, todo,
+                                                  chunk_size=visualizer_config.get("chunk_size", 20))
+        else:
+            prompts = {}
+            for i in todo:
+                seg = segments[i]
+                # Context
+                previous_context = ""
+                if i > 0:
+                    previous_context = segments[i-1].get("visual_description", segments[i-1].get("text", ""))
+
+                visual_desc = seg.get("visual_description", "")
+                prompts[i] = visualizer.generate_prompt(seg['text'], style_bible, previous_context,
+                                                        visual_description=visual_desc, index=i)
+
+        # Assets from fallback prompts are kept for this run and regenerated on the next
+        for i in todo:
+            if i in visualizer.fallback_segments:
+                segments[i]["fallback_prompt"] = True
+            else:
+                segments[i].pop("fallback_prompt", None)
+        if visualizer.used_fallback:
+            self.log(f"Visualizer fell back for {len(visualizer.fallback_segments)} segment(s); "
+                     "they will be regenerated on the next run.")
+            self.provisional.add('visualize')
+
+        # 4. Generate assets (fallback prompts are not stored under their inputs)
+        video_jobs = []
+        for i in todo:
+            seg = segments[i]
+            self.log(f"Processing Segment {i+1}/{len(segments)} [{seg['type']}]: {seg.get('text', '')}")
+            prompt = prompts[i]
+            source = None if i in visualizer.fallback_segments else sources[i]
+
+            if use_veo:
+                # Queue the job; all Veo operations are submitted and polled together below
+                duration = seg["end"] - seg["start"]
+                video_jobs.append(VideoJob(i, prompt, seg["asset_path"], duration, source=source))
+            else:
+                generator.generate_image(prompt, seg["asset_path"], source=source)
+
+        if video_jobs:
+            self.log(f"Submitting {len(video_jobs)} Veo jobs...")
+            scheduler = VideoJobScheduler.from_config(generator, config)
+            scheduler.run(video_jobs)
+
+        for seg in segments:
+            if "reuse_of" in seg:
+                seg["asset_path"] = segments[seg["reuse_of"]]["asset_path"]
+
+        if generator.store:
+            self.log(generator.store.summary())
+
+        # Save updated segments with asset paths
+        self._merge_segments(segments, ["asset_path", "reuse_of", "variation", "fallback_prompt"])
+
+        # Leave the step unrecorded so the next run retries just the missing assets
+        missing = [i + 1 for i in todo if not os.path.exists(segments[i]["asset_path"])]
+        if missing:
+            return self._fail(f"Asset generation failed for segment(s) {missing}; re-run to retry them.")
+        return True
+
+    # --- Step 4: Text Rendering ---
+    def step_render(self):
+        self.log("--- Step 4: Text Rendering ---")
+        from src.visuals.text_renderer import TextRenderer
+        if not os.path.exists(self.segments_path):
+            return self._fail("Segments not found. Run 'visualize' step first.")
+
+        segments = self._load_segments()
+
+        renderer = TextRenderer(self.config)
+        text_dir = os.path.join(self.output_dir, "assets", "text")
+        overlays, captions = {}, {}
+        if renderer.mode == "overlay":
+            overlays = renderer.render_segments(segments, text_dir)
+        else:
+            captions = renderer.render_captions(segments, text_dir)
+
+        # These records (overlay path + frame position, or caption file) are what compose reads
+        for i, seg in enumerate(segments):
+            for field, records in (("text_overlay", overlays), ("captions", captions)):
+                if i in records:
+                    seg[field] = records[i]
+                else:
+                    seg.pop(field, None)
+            seg.pop("text_img", None)
+        self._merge_segments(segments, ["text_overlay", "captions", "text_img"])
+        return True
+
+    # --- Step 5: Compose ---
+    def step_compose(self):
+        self.log("--- Step 5: Composition ---")
+        from src.video.compositor import VideoCompositor
+        from src.visuals.text_renderer import TextRenderer
+        if not os.path.exists(self.segments_path):
+            return self._fail("Segments not found.")
+        segments = self._load_segments()
+
+        # Validate Assets
+        missing_assets = []
+        for i, seg in enumerate(segments):
+            if seg.get("type") == "lyrics":
+                asset_path = seg.get("asset_path")
+                if not asset_path or not os.path.exists(asset_path):
+                    missing_assets.append(f"Segment {i+1} (Text: {seg.get('text', '')[:30]}...)")
+
+        if missing_assets:
+            self.log("Error: Cannot compose video. Missing assets for the following segments:")
+            for msg in missing_assets:
+                self.log(f"  - {msg}")
+            return self._fail("Please check your 'visualize' step output and re-run.")
+
+        compositor = VideoCompositor(self.config, draft=self.draft)
+
+        compositor.create_video(segments, self.audio_file, self.final_output_path)
+        # Keep the asset probes so the next compose doesn't re-probe unchanged assets
+        self._merge_segments(segments, ["asset_probe"])
+        self.log(f"Video Render Complete: {self.final_output_path}")
+
+        # Generate Subtitles
+        srt_content = generate_srt(segments)
+        srt_path = os.path.join(self.output_dir, f"{self.poem_name}.srt")
+        with open(srt_path, "w") as f:
+            f.write(srt_content)
+        self.log(f"Subtitles Generated: {srt_path}")
+
+        # Word-timed karaoke track for players that load sidecar subtitles
+        ass_path = os.path.join(self.output_dir, f"{self.poem_name}.ass")
+        with open(ass_path, "w", encoding="utf-8") as f:
+            f.write(generate_ass(segments, **TextRenderer(self.config).ass_style()))
+        self.log(f"Karaoke Subtitles Generated: {ass_path}")
+
+        return True
+
+    # --- Step 2-B: YouTube Metadata ---
+    def step_metadata(self):
+        # Needs only the lyrics and subject, so it runs alongside alignment and the Director
+        self.log("Generating YouTube Metadata...")
+        try:
+            marketing_agent = MarketingAgent()
+            meta_content = marketing_agent.generate_metadata(self._read_lyrics(), self.config.get("subject", ""), self.poem_name)
+        except Exception as e:
+            self.log(f"Warning: Metadata generation failed: {e}")
+            meta_content = None
+
+        if meta_content:
+            with open(self.metadata_path, "w") as f:
+                f.write(meta_content)
+            self.log(f"Metadata Generated: {self.metadata_path}")
+        # Optional output: a failure must not block the video
+        return True
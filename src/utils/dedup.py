@@ -0,0 +1,43 @@
+from src.utils.text_align import normalize_token, tokenize_lyrics
+
+# Cheap ways to make a reused asset look different, applied by the compositor.
+# Opt-in (dedup.variations): "mirror" flips the frame, text and art included.
+VARIATIONS = ("mirror", "offset")
+
+
+def line_key(text, match="normalized"):
+    """Grouping key for a lyric line: exact text, or normalized tokens (case, punctuation, nukta...)."""
+    if match == "exact":
+        return text.strip()
+    return " ".join(normalize_token(tok) for tok in tokenize_lyrics(text))
+
+
+def mark_repeats(segments, match="normalized", match_visual=False, variations=()):
+    """
+    Marks lyric segments that repeat an earlier line (choruses): sets
+    seg["reuse_of"] to the first occurrence's index and seg["variation"] to
+    a cycling entry of `variations` (None when empty), and clears both on
+    everything else. With match_visual, the screenwriter's visual
+    descriptions must match too. Returns the number of reused segments.
+    """
+    first = {}
+    reused = 0
+    for i, seg in enumerate(segments):
+        seg.pop("reuse_of", None)
+        seg.pop("variation", None)
+        if seg.get("type") != "lyrics":
+            continue
+        key = line_key(seg.get("text", ""), match)
+        if not key:
+            continue
+        if match_visual:
+            key = (key, seg.get("visual_description", "").strip())
+        if key not in first:
+            first[key] = {"index": i, "repeats": 0}
+            continue
+        group = first[key]
+        seg["reuse_of"] = group["index"]
+        seg["variation"] = variations[group["repeats"] % len(variations)] if variations else None
+        group["repeats"] += 1
+        reused += 1
+    return reused
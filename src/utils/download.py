@@ -0,0 +1,129 @@
+import base64
+import hashlib
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.utils.retry import call_with_retries
+from src.utils.trace import count
+
+_session = None
+_session_lock = threading.Lock()
+
+CHUNK_SIZE = 1024 * 1024
+# (connect, read) seconds; read is per chunk, not for the whole file
+TIMEOUT = (10, 60)
+
+
+class DownloadError(RuntimeError):
+    """Downloaded file failed size or checksum verification."""
+
+
+def get_session(pool_size=16):
+    """Process-wide requests.Session; its connection pool is shared by all download threads."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def _total_size(response, offset):
+    """Full file size from Content-Range (206) or Content-Length, if the server sent it."""
+    content_range = response.headers.get("Content-Range", "")
+    if "/" in content_range and not content_range.endswith("/*"):
+        return int(content_range.rsplit("/", 1)[1])
+    length = response.headers.get("Content-Length")
+    return offset + int(length) if length is not None else None
+
+
+def _server_md5(response):
+    """Hex MD5 of the whole object from an x-goog-hash header (GCS), if present."""
+    for item in response.headers.get("x-goog-hash", "").split(","):
+        name, _, value = item.strip().partition("=")
+        if name == "md5" and value:
+            return base64.b64decode(value).hex()
+    return None
+
+
+def _digests(path, names):
+    hashes = {name: hashlib.new(name) for name in names}
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            for h in hashes.values():
+                h.update(chunk)
+    return {name: h.hexdigest() for name, h in hashes.items()}
+
+
+def _fetch(url, part_path, headers, timeout):
+    """
+    One attempt: resumes part_path from its current size with a Range
+    request and streams the rest to it. Returns the expected total size and
+    the server's MD5 of the object (or None).
+    """
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    request_headers = dict(headers or {})
+    if offset:
+        request_headers["Range"] = f"bytes={offset}-"
+
+    with get_session().get(url, headers=request_headers, stream=True, timeout=timeout) as r:
+        if r.status_code == 416 and offset:
+            # Nothing left past our offset: the part is already complete
+            return offset, None
+        r.raise_for_status()
+        if offset and r.status_code != 206:
+            # Server ignored the Range header; start over
+            offset = 0
+        total = _total_size(r, offset)
+        md5 = _server_md5(r)
+        with open(part_path, "ab" if offset else "wb") as f:
+            for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                f.write(chunk)
+                count("download.bytes", len(chunk))
+    return total, md5
+
+
+def download(url, output_path, headers=None, expected_size=None, expected_sha256=None, policy=None,
+             timeout=TIMEOUT):
+    """
+    Streams url to output_path via <output_path>.part, then renames it into
+    place, so output_path is either absent or complete. Transient failures
+    (timeouts, resets, 429/5xx) are retried per policy; each retry resumes
+    from the bytes already on disk. The result is checked against
+    expected_size / expected_sha256 when given, and against the server's
+    length and x-goog-hash MD5 when it sends them.
+    """
+    part_path = f"{output_path}.part"
+    label = f"Download {os.path.basename(output_path)}"
+    # A leftover part may be from another URL (e.g. a clip regenerated on a
+    # re-run); resuming it would splice two files. Only retries within this
+    # call resume.
+    if os.path.exists(part_path):
+        os.remove(part_path)
+    total, server_md5 = call_with_retries(lambda: _fetch(url, part_path, headers, timeout), policy=policy,
+                                          label=label)
+
+    size = os.path.getsize(part_path)
+    expected = expected_size if expected_size is not None else total
+    problem = None
+    if expected is not None and size != expected:
+        problem = f"size {size} != expected {expected}"
+    # Right length is not enough: a corrupted body would end up in the asset store
+    checks = {name: value.lower() for name, value in (("sha256", expected_sha256), ("md5", server_md5)) if value}
+    if checks and not problem:
+        digests = _digests(part_path, checks)
+        for name, value in checks.items():
+            if digests[name] != value:
+                problem = f"{name} {digests[name]} != expected {value}"
+    if problem:
+        # A bad part must not be resumed from
+        os.remove(part_path)
+        raise DownloadError(f"{label} failed verification: {problem}")
+
+    os.replace(part_path, output_path)
+    return output_path
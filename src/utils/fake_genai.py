@@ -0,0 +1,292 @@
+import atexit
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+import ffmpeg
+from PIL import Image, ImageDraw
+
+# Per-call delays: seconds, or [median, p95] for a lognormal spread.
+DEFAULT_LATENCY = {
+    "generate_content": [1.5, 5.0],
+    "generate_images": [6.0, 15.0],
+    "generate_videos": [0.5, 1.5],   # the submit call itself
+    "veo_operation": [60.0, 150.0],  # submit -> operation done
+    "operations_get": [0.1, 0.3],
+    "download": [1.0, 4.0],
+}
+
+
+# Stand-ins for the google.genai.types config classes this project builds,
+# so the fake backend runs without the SDK installed
+types = SimpleNamespace(
+    GenerateContentConfig=SimpleNamespace,
+    SafetySetting=SimpleNamespace,
+    GenerateImagesConfig=SimpleNamespace,
+    GenerateVideosConfig=SimpleNamespace,
+)
+
+
+class FakeAPIError(Exception):
+    """Injected API failure; carries the HTTP status in .code like the SDK's APIError."""
+
+    def __init__(self, code, message):
+        super().__init__(f"{code} {message}")
+        self.code = code
+        self.message = message
+
+
+class Latency:
+    """Delay distribution: fixed seconds, or lognormal from [median, p95]."""
+
+    def __init__(self, spec, scale=1.0):
+        if isinstance(spec, (int, float)):
+            self.median, self.sigma = float(spec), 0.0
+        else:
+            median, p95 = spec
+            self.median = float(median)
+            # p95 of a lognormal is median * exp(1.645 sigma)
+            self.sigma = math.log(p95 / median) / 1.645 if p95 > median > 0 else 0.0
+        self.scale = scale
+
+    def sample(self, rng):
+        if self.median <= 0:
+            return 0.0
+        return self.scale * self.median * math.exp(self.sigma * rng.gauss(0, 1))
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _reply(prompt, json_mode):
+    """
+    Deterministic stand-in for the model's answer, shaped like what each
+    agent's prompt asks for (recognised by its output-format markers).
+    """
+    tag = _digest(prompt)[:8]
+    if not json_mode:
+        return f"Fake scene {tag}: a cheerful cartoon character in a bright, colourful world"
+    if '"style_bible_suffix"' in prompt:
+        data = {
+            "character": f"A friendly cartoon character {tag} with big eyes and a warm smile",
+            "setting": "A sunny meadow with soft hills and a clear blue sky",
+            "style_bible_suffix": "3d render, soft lighting, vibrant colours",
+        }
+    elif '"descriptions"' in prompt:
+        segments = re.findall(r"^\s*Segment (\d+):", prompt, re.MULTILINE)
+        data = {"descriptions": [f"Scene {n} ({tag}): the character reacts to the line" for n in segments]}
+    elif '"prompts"' in prompt:
+        segments = []
+        for line in (l.strip() for l in prompt.splitlines()):
+            if not line.startswith('{"segment"'):
+                continue
+            try:
+                segments.append(json.loads(line)["segment"])
+            except ValueError:
+                pass  # the output-format example, not a scene
+        data = {"prompts": [{"segment": n, "prompt": f"The character, scene {n} ({tag})"} for n in segments]}
+    elif "Input JSON:" in prompt:
+        # Text refiner: hand the word list back unchanged
+        words = prompt.split("Input JSON:", 1)[1].split("Output:", 1)[0]
+        try:
+            data = json.loads(words)
+        except ValueError:
+            data = []
+    else:
+        data = {}
+    return json.dumps(data, ensure_ascii=False)
+
+
+class _Response:
+    def __init__(self, prompt, text):
+        self.text = text
+        self.usage_metadata = SimpleNamespace(prompt_token_count=max(1, len(prompt) // 4),
+                                              candidates_token_count=max(1, len(text) // 4))
+
+
+class _Image:
+    """Solid colour derived from the prompt, with the prompt hash written on it."""
+
+    def __init__(self, prompt, size):
+        self.prompt = prompt
+        self.size = size
+
+    def save(self, location):
+        tag = _digest(self.prompt)
+        colour = tuple(int(tag[i:i + 2], 16) for i in (0, 2, 4))
+        img = Image.new("RGB", self.size, colour)
+        ImageDraw.Draw(img).text((20, 20), tag[:12], fill="white")
+        img.save(location, format="PNG")
+
+
+class _Video:
+    # No uri: the generator falls back to files.download + save
+    uri = None
+
+    def __init__(self, client):
+        self._client = client
+        self.downloaded = False
+
+    def save(self, path):
+        if not self.downloaded:
+            raise ValueError("Video has not been downloaded.")
+        shutil.copyfile(self._client.synthetic_clip(), path)
+
+
+class _Operation:
+    def __init__(self, name, ready_at, fails):
+        self.name = name
+        self.ready_at = ready_at
+        self.fails = fails
+        self.done = False
+        self.response = None
+        self.error = None
+
+
+class _Models:
+    def __init__(self, client):
+        self._client = client
+
+    def generate_content(self, model, contents, config=None):
+        self._client._call("generate_content")
+        return self._client._content(contents, config)
+
+    def generate_images(self, model, prompt, config=None):
+        self._client._call("generate_images")
+        image = _Image(prompt, self._client.image_size)
+        return SimpleNamespace(generated_images=[SimpleNamespace(image=image)])
+
+    def generate_videos(self, model, prompt, config=None):
+        self._client._call("generate_videos")
+        return self._client._start_operation(model)
+
+
+class _Operations:
+    def __init__(self, client):
+        self._client = client
+
+    def get(self, operation):
+        self._client._call("operations_get")
+        op = operation
+        if not op.done and time.time() >= op.ready_at:
+            op.done = True
+            if op.fails:
+                op.error = {"code": 13, "message": "Injected generation failure"}
+            else:
+                op.response = SimpleNamespace(generated_videos=[SimpleNamespace(video=_Video(self._client))])
+        return op
+
+
+class _Files:
+    def __init__(self, client):
+        self._client = client
+
+    def download(self, file):
+        self._client._call("download")
+        file.downloaded = True
+        return b""
+
+
+class FakeClient:
+    """
+    Local stand-in for genai.Client (the parts this project uses), for load
+    testing and profiling without quota.
+
+    Text calls return deterministic JSON/text shaped for each agent, Imagen
+    returns a flat-colour PNG and Veo runs long-running operations that finish
+    after a sampled delay and yield a synthetic testsrc2 MP4. Every call
+    sleeps for a delay drawn from its latency distribution (scaled by
+    time_scale) and fails with a 429/5xx at errors.rate. Configured by the
+    `llm.fake` section; thread-safe.
+    """
+
+    def __init__(self, config=None):
+        config = config or {}
+        self.time_scale = config.get("time_scale", 1.0)
+        latency = dict(DEFAULT_LATENCY)
+        latency.update(config.get("latency") or {})
+        self.latency = {kind: Latency(spec, self.time_scale) for kind, spec in latency.items()}
+        errors = config.get("errors") or {}
+        self.error_rate = errors.get("rate", 0.0)
+        self.error_codes = errors.get("codes", [429, 503])
+        self.veo_failure_rate = errors.get("veo_failure_rate", 0.0)
+        self.image_size = tuple(config.get("image_size", (768, 1408)))
+        self.video_size = tuple(config.get("video_size", (720, 1280)))
+        self.video_seconds = config.get("video_seconds", 8)
+        self.calls = {}
+
+        self._rng = random.Random(config.get("seed", 0))
+        self._lock = threading.Lock()
+        self._op_ids = itertools.count(1)
+        self._clip_path = None
+        self._clip_lock = threading.Lock()
+
+        self.models = _Models(self)
+        self.operations = _Operations(self)
+        self.files = _Files(self)
+
+    def _draw(self, kind):
+        """Delay and injected status (or None) for one call; also tallies it."""
+        with self._lock:
+            delay = self.latency[kind].sample(self._rng)
+            code = None
+            if self.error_rate and self._rng.random() < self.error_rate:
+                code = self._rng.choice(self.error_codes)
+                # Rate limiting is answered before any work is done
+                if code == 429:
+                    delay *= 0.1
+            stats = self.calls.setdefault(kind, {"calls": 0, "errors": 0})
+            stats["calls"] += 1
+            stats["errors"] += code is not None
+        return delay, code
+
+    def _raise(self, code):
+        if code is not None:
+            raise FakeAPIError(code, "RESOURCE_EXHAUSTED" if code == 429 else "Injected server error")
+
+    def _call(self, kind):
+        delay, code = self._draw(kind)
+        time.sleep(delay)
+        self._raise(code)
+
+    def _content(self, contents, config):
+        prompt = contents if isinstance(contents, str) else json.dumps(contents, default=str, ensure_ascii=False)
+        json_mode = getattr(config, "response_mime_type", None) == "application/json"
+        return _Response(prompt, _reply(prompt, json_mode))
+
+    def _start_operation(self, model):
+        with self._lock:
+            ready_at = time.time() + self.latency["veo_operation"].sample(self._rng)
+            fails = bool(self.veo_failure_rate) and self._rng.random() < self.veo_failure_rate
+        return _Operation(f"models/{model}/operations/fake-{next(self._op_ids)}", ready_at, fails)
+
+    def synthetic_clip(self):
+        """Path of the shared synthetic clip, encoded on first use."""
+        with self._clip_lock:
+            if self._clip_path is None:
+                tmp_dir = tempfile.mkdtemp(prefix="fake_genai_")
+                atexit.register(shutil.rmtree, tmp_dir, True)
+                path = os.path.join(tmp_dir, "clip.mp4")
+                width, height = self.video_size
+                source = ffmpeg.input(f"testsrc2=size={width}x{height}:rate=24:duration={self.video_seconds}",
+                                      f="lavfi")
+                ffmpeg.output(source, path, vcodec="libx264", preset="ultrafast", pix_fmt="yuv420p") \
+                    .run(overwrite_output=True, quiet=True)
+                self._clip_path = path
+            return self._clip_path
+
+    def summary(self):
+        with self._lock:
+            calls = {kind: dict(s) for kind, s in self.calls.items()}
+        parts = [f"{kind} {s['calls']} ({s['errors']} err)" for kind, s in sorted(calls.items())]
+        return "Fake GenAI calls: " + (", ".join(parts) or "none")
@@ -0,0 +1,241 @@
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+_hash_memo = {}
+_hash_lock = threading.Lock()
+
+# One FileCache per root directory, process-wide, see shared_cache()
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """SHA-256 of a file's contents, memoized per (path, size, mtime)."""
+    st = os.stat(path)
+    memo_key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    with _hash_lock:
+        if memo_key in _hash_memo:
+            return _hash_memo[memo_key]
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+
+    with _hash_lock:
+        _hash_memo[memo_key] = digest
+    return digest
+
+
+def hash_key(*parts):
+    """Stable SHA-256 over JSON-serialisable parts (dict keys are sorted)."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cache_root(config):
+    """Shared cache directory: cache.dir, or <project.output_dir>/.cache."""
+    cache_dir = config.get("cache", {}).get("dir")
+    if cache_dir:
+        return cache_dir
+    return os.path.join(config.get("project", {}).get("output_dir", "output"), ".cache")
+
+
+def link_or_copy(src, dst):
+    """Hardlinks src to dst (replacing dst), falling back to a copy across filesystems."""
+    tmp = f"{dst}.tmp{os.getpid()}_{threading.get_ident()}"
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+class FileCache:
+    """
+    Content-addressed file store with a JSON manifest and LRU eviction.
+
+    Entries are files named <key><ext> under `root`. The manifest tracks size,
+    creation and last-use time plus caller metadata; when the total size exceeds
+    max_bytes the least recently used entries are removed, and entries older
+    than max_age_s are treated as misses. With sidecars, each entry's metadata
+    is also written next to it as <key><ext>.json. Safe to share between
+    threads of one process (use shared_cache() so they share one instance);
+    saving merges in entries other processes added to the manifest.
+    """
+
+    MANIFEST = "manifest.json"
+    # Hits only refresh last_used; persist those at most this often
+    HIT_SAVE_INTERVAL_S = 30
+
+    def __init__(self, root, max_bytes=None, name="cache", max_age_s=None, sidecars=False):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.name = name
+        self.sidecars = sidecars
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._manifest_path = os.path.join(root, self.MANIFEST)
+        self._entries = self._load_manifest()
+        # Keys this instance removed, so merging doesn't bring them back
+        self._removed = set()
+        self._dirty = False
+        self._saved_at = time.time()
+
+    def _load_manifest(self):
+        if not os.path.exists(self._manifest_path):
+            return {}
+        try:
+            with open(self._manifest_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: {self.name} manifest unreadable ({e}); starting empty.")
+            return {}
+
+    def _save_manifest(self):
+        # Keep entries another process committed since we loaded the manifest
+        for key, entry in self._load_manifest().items():
+            if key not in self._entries and key not in self._removed and os.path.exists(self._path(entry)):
+                self._entries[key] = entry
+        tmp = f"{self._manifest_path}.tmp{os.getpid()}_{threading.get_ident()}"
+        with open(tmp, "w") as f:
+            json.dump(self._entries, f, indent=2)
+        os.replace(tmp, self._manifest_path)
+        self._dirty = False
+        self._saved_at = time.time()
+
+    def flush(self):
+        """Persists last-used times of recent hits."""
+        with self._lock:
+            if self._dirty:
+                self._save_manifest()
+
+    def _path(self, entry):
+        return os.path.join(self.root, entry["file"])
+
+    def get(self, key):
+        """Returns the cached file path for key, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and self._expired(entry):
+                self._remove(key)
+                entry = None
+            if entry and os.path.exists(self._path(entry)):
+                entry["last_used"] = time.time()
+                self.hits += 1
+                self._dirty = True
+                if time.time() - self._saved_at > self.HIT_SAVE_INTERVAL_S:
+                    self._save_manifest()
+                return self._path(entry)
+            if entry:
+                # File vanished behind our back
+                del self._entries[key]
+                self._removed.add(key)
+            self.misses += 1
+            return None
+
+    def put(self, key, src_path, meta=None):
+        """Stores a copy of src_path under key and returns the cached path."""
+        entry = self._new_entry(key, os.path.splitext(src_path)[1], os.path.getsize(src_path), meta)
+        link_or_copy(src_path, self._path(entry))
+        return self._commit(key, entry)
+
+    def get_data(self, key):
+        """Returns the cached bytes for key, or None on a miss."""
+        path = self.get(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            # Evicted by another thread between lookup and read
+            return None
+
+    def put_data(self, key, data, ext=".bin", meta=None):
+        """Stores raw bytes under key and returns the cached path."""
+        entry = self._new_entry(key, ext, len(data), meta)
+        tmp = f"{self._path(entry)}.tmp{os.getpid()}_{threading.get_ident()}"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self._path(entry))
+        return self._commit(key, entry)
+
+    def _new_entry(self, key, ext, size, meta):
+        now = time.time()
+        return {"file": f"{key}{ext}", "size": size, "created": now, "last_used": now, "meta": meta or {}}
+
+    def _commit(self, key, entry):
+        if self.sidecars:
+            with open(f"{self._path(entry)}.json", "w") as f:
+                json.dump({"key": key, **entry}, f, indent=2, ensure_ascii=False)
+        with self._lock:
+            self._entries[key] = entry
+            self._removed.discard(key)
+            self._evict()
+            self._save_manifest()
+        return self._path(entry)
+
+    def _expired(self, entry):
+        return bool(self.max_age_s) and time.time() - entry["created"] > self.max_age_s
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._removed.add(key)
+        for path in (self._path(entry), f"{self._path(entry)}.json"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def total_bytes(self):
+        with self._lock:
+            return sum(e["size"] for e in self._entries.values())
+
+    def _evict(self):
+        for key in [k for k, e in self._entries.items() if self._expired(e)]:
+            self._remove(key)
+        if not self.max_bytes:
+            return
+        total = sum(e["size"] for e in self._entries.values())
+        for key, entry in sorted(self._entries.items(), key=lambda kv: kv[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            total -= entry["size"]
+            self._remove(key)
+
+    def summary(self):
+        return (f"{self.name}: {self.hits} hit(s), {self.misses} miss(es), "
+                f"{self.total_bytes() / 1e6:.1f} MB stored")
+
+
+def shared_cache(root, **kwargs):
+    """
+    The process-wide FileCache for root, created with kwargs on first use.
+    Every user of one directory must go through the same instance, or their
+    in-memory manifests overwrite each other. Later calls asking for other
+    size/age/sidecar settings than the existing instance's get a warning and
+    the existing settings.
+    """
+    key = os.path.abspath(root)
+    with _shared_lock:
+        if key not in _shared:
+            _shared[key] = FileCache(root, **kwargs)
+            atexit.register(_shared[key].flush)
+        cache = _shared[key]
+    differing = {name: (getattr(cache, name), value) for name, value in kwargs.items()
+                 if name in ("max_bytes", "max_age_s", "sidecars") and getattr(cache, name) != value}
+    if differing:
+        print(f"Warning: {cache.name} at {root} already open with other settings; ignoring "
+              + ", ".join(f"{name}={new!r} (using {old!r})" for name, (old, new) in differing.items()))
+    return cache
+
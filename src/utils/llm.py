@@ -1,65 +1,228 @@
 import os
-from google import genai
-from google.genai import types
+import threading
+
+from src.utils.file_cache import cache_root, hash_key, shared_cache
+from src.utils.retry import RateLimiter, RetryPolicy, call_with_retries
+from src.utils.trace import count, span
+
+# Process-wide response cache, installed by configure_cache() (opt-in).
+_response_cache = None
+
+# Process-wide SDK clients (one per API key) and per-model limits, see configure().
+_clients = {}
+_clients_lock = threading.Lock()
+_rate_limiters = {}
+_retry_policy = RetryPolicy()
+
+# "genai" (Google GenAI SDK) or "fake" (local stand-in, see src/utils/fake_genai.py)
+_backend = "genai"
+_fake_config = {}
+
+
+class LLMError(RuntimeError):
+    """Raised when a Gemini call fails after all retries."""
+
+
+def get_client(api_key=None):
+    """
+    Returns the shared genai.Client for api_key, creating it on first use so
+    every agent and generator reuses one connection pool. With the fake
+    backend, returns the shared FakeClient instead (no key needed).
+    """
+    if _backend == "fake":
+        with _clients_lock:
+            if "fake" not in _clients:
+                from src.utils.fake_genai import FakeClient
+                _clients["fake"] = FakeClient(_fake_config)
+            return _clients["fake"]
+    api_key = api_key or os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY not found in environment variables.")
+    with _clients_lock:
+        if api_key not in _clients:
+            # Imported on first use: the SDK is slow to import and only the API-calling steps need it
+            from google import genai
+            _clients[api_key] = genai.Client(api_key=api_key)
+        return _clients[api_key]
+
+
+def genai_types():
+    """google.genai.types for the real SDK, or the fake backend's stand-ins."""
+    if _backend == "fake":
+        from src.utils.fake_genai import types
+        return types
+    from google.genai import types
+    return types
+
+
+def get_rate_limiter(model_name):
+    """Token bucket for model_name (or the 'default' entry), or None if unlimited."""
+    return _rate_limiters.get(model_name) or _rate_limiters.get("default")
+
+
+def get_retry_policy():
+    return _retry_policy
+
+
+def configure(config, bypass_cache=False):
+    """
+    Applies the `llm` config section process-wide: backend, retry policy,
+    per-model rate limits (requests per minute) and the optional response cache.
+    """
+    global _retry_policy, _rate_limiters, _backend, _fake_config
+    llm_config = config.get("llm", {})
+    backend = llm_config.get("backend", "genai")
+    if backend not in ("genai", "fake"):
+        raise ValueError(f"Unknown llm.backend: {backend!r} (expected 'genai' or 'fake')")
+    with _clients_lock:
+        if (backend, llm_config.get("fake") or {}) != (_backend, _fake_config):
+            _clients.pop("fake", None)
+        _backend, _fake_config = backend, llm_config.get("fake") or {}
+    _retry_policy = RetryPolicy.from_config(llm_config.get("retry", {}))
+    _rate_limiters = {
+        model: RateLimiter(rpm)
+        for model, rpm in (llm_config.get("rate_limits") or {}).items()
+        if rpm
+    }
+    configure_cache(config, bypass=bypass_cache)
+
+
+def configure_cache(config, bypass=False):
+    """
+    Enables the persistent LLM response cache from the `llm.cache` config section.
+    With bypass=True (or the section disabled) every call goes to the API.
+    """
+    global _response_cache
+    cache_config = config.get("llm", {}).get("cache", {})
+    if bypass or not cache_config.get("enabled", False):
+        _response_cache = None
+        return None
+
+    ttl_hours = cache_config.get("ttl_hours", 168)
+    _response_cache = shared_cache(
+        os.path.join(cache_root(config), "llm"),
+        max_bytes=int(cache_config.get("max_mb", 512) * 1024 * 1024),
+        max_age_s=ttl_hours * 3600 if ttl_hours else None,
+        name="LLM cache",
+    )
+    print(f"LLM response cache enabled: {_response_cache.root}")
+    return _response_cache
+
+
+def backend_summary():
+    """Per-call tallies of the fake backend, or None with the real SDK."""
+    client = _clients.get("fake") if _backend == "fake" else None
+    return client.summary() if client else None
+
+
+def cache_summary():
+    """Hit/miss line for the response cache, or None when it is disabled."""
+    return _response_cache.summary() if _response_cache else None
+
 
 class GeminiClient:
-    def __init__(self, api_key=None, model_name="gemini-2.0-flash-exp"): 
-        # Note: Updated default to a newer model valid for v1 SDK if possible, 
-        # or stick to user's "gemini-3-flash-preview" if valid. 
+    def __init__(self, api_key=None, model_name="gemini-2.0-flash-exp"):
+        # Note: Updated default to a newer model valid for v1 SDK if possible,
+        # or stick to user's "gemini-3-flash-preview" if valid.
         # For safety I will use "gemini-2.0-flash-exp" or keep "gemini-3-flash-preview" if it exists.
         # User requested "gemini-3-flash-preview" earlier. Let's keep it but handle if it fails.
         # Actually "gemini-1.5-pro" is safer stable default.
-        
+
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
-            raise ValueError("GEMINI_API_KEY not found in environment variables.")
-        
-        self.client = genai.Client(api_key=self.api_key)
+        self.client = get_client(self.api_key)
         self.model_name = model_name
 
-    def generate_content(self, prompt, response_mime_type="text/plain"):
+    def _generation_config(self, response_mime_type):
+        """Generation parameters as a plain dict (also used as part of the cache key)."""
+        params = {
+            "temperature": 0.7,
+            "top_p": 0.95,
+            "top_k": 64,
+            "max_output_tokens": 8192,
+            "safety_settings": [
+                {"category": category, "threshold": "BLOCK_ONLY_HIGH"}
+                for category in [
+                    "HARM_CATEGORY_HARASSMENT",
+                    "HARM_CATEGORY_HATE_SPEECH",
+                    "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+                    "HARM_CATEGORY_DANGEROUS_CONTENT",
+                ]
+            ],
+        }
+        if response_mime_type == "application/json":
+            params["response_mime_type"] = "application/json"
+        return params
+
+    def _build_config(self, params):
+        types = genai_types()
+        config = types.GenerateContentConfig(
+            temperature=params["temperature"],
+            top_p=params["top_p"],
+            top_k=params["top_k"],
+            max_output_tokens=params["max_output_tokens"],
+            safety_settings=[types.SafetySetting(**s) for s in params["safety_settings"]]
+        )
+        if params.get("response_mime_type") == "application/json":
+            config.response_mime_type = "application/json"
+        return config
+
+    def _cache_lookup(self, prompt, response_mime_type, params, use_cache):
+        cache = _response_cache if use_cache else None
+        if not cache:
+            return None, None, None
+        cache_key = hash_key(self.model_name, prompt, response_mime_type, params)
+        cached = cache.get_data(cache_key)
+        return cache, cache_key, (cached.decode("utf-8") if cached is not None else None)
+
+    def _cache_store(self, cache, cache_key, text, response_mime_type):
+        if cache and text is not None:
+            cache.put_data(cache_key, text.encode("utf-8"), ext=".txt",
+                           meta={"model": self.model_name, "mime_type": response_mime_type})
+
+    def _record_usage(self, response, span_args):
+        """Token counts from the response, onto the trace's counters and the call's span."""
+        usage = getattr(response, "usage_metadata", None)
+        tokens_in = getattr(usage, "prompt_token_count", None) or 0
+        tokens_out = getattr(usage, "candidates_token_count", None) or 0
+        span_args.update(tokens_in=tokens_in, tokens_out=tokens_out)
+        count("llm.calls")
+        count("llm.tokens_in", tokens_in)
+        count("llm.tokens_out", tokens_out)
+
+    def generate_content(self, prompt, response_mime_type="text/plain", use_cache=True):
         """
         Generates content using the configured Gemini model.
         supports response_schema for JSON extraction if needed (via config).
+        Responses are served from the persistent cache when it is enabled,
+        unless use_cache=False. Transient errors (429/5xx) are retried with
+        backoff; raises LLMError once retries are exhausted.
         """
-        config = types.GenerateContentConfig(
-            temperature=0.7,
-            top_p=0.95,
-            top_k=64,
-            max_output_tokens=8192,
-            safety_settings=[
-                types.SafetySetting(
-                    category="HARM_CATEGORY_HARASSMENT",
-                    threshold="BLOCK_ONLY_HIGH"
-                ),
-                types.SafetySetting(
-                    category="HARM_CATEGORY_HATE_SPEECH",
-                    threshold="BLOCK_ONLY_HIGH"
-                ),
-                types.SafetySetting(
-                    category="HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                    threshold="BLOCK_ONLY_HIGH"
-                ),
-                types.SafetySetting(
-                    category="HARM_CATEGORY_DANGEROUS_CONTENT",
-                    threshold="BLOCK_ONLY_HIGH"
+        params = self._generation_config(response_mime_type)
+        cache, cache_key, cached = self._cache_lookup(prompt, response_mime_type, params, use_cache)
+        if cached is not None:
+            count("llm.cache_hits")
+            return cached
+
+        config = self._build_config(params)
+        with span(f"gemini {self.model_name}", cat="llm") as span_args:
+            try:
+                response = call_with_retries(
+                    lambda: self.client.models.generate_content(
+                        model=self.model_name,
+                        contents=prompt,
+                        config=config
+                    ),
+                    policy=_retry_policy,
+                    limiter=get_rate_limiter(self.model_name),
+                    label=f"Gemini ({self.model_name})",
                 )
-            ]
-        )
-        
-        if response_mime_type == "application/json":
-            config.response_mime_type = "application/json"
+            except Exception as e:
+                print(f"Error generating content: {e}")
+                raise LLMError(f"{self.model_name} generate_content failed: {e}") from e
+            self._record_usage(response, span_args)
 
-        try:
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=prompt,
-                config=config
-            )
-            return response.text
-        except Exception as e:
-            print(f"Error generating content: {e}")
-            return None
+        self._cache_store(cache, cache_key, response.text, response_mime_type)
+        return response.text
 
 if __name__ == "__main__":
     # Test
@@ -0,0 +1,97 @@
+import random
+import threading
+import time
+
+from src.utils.trace import count
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """
+    Token bucket shared by every caller of one model.
+    `rate_per_minute` requests are admitted on average, with bursts up to `burst`.
+    """
+
+    def __init__(self, rate_per_minute, burst=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst or max(1, int(rate_per_minute // 10) or 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Takes one token (possibly going into debt) and returns how long to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for transient API errors."""
+
+    def __init__(self, max_attempts=5, base_delay=1.0, max_delay=30.0):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @classmethod
+    def from_config(cls, retry_config):
+        return cls(
+            max_attempts=retry_config.get("max_attempts", 5),
+            base_delay=retry_config.get("base_delay", 1.0),
+            max_delay=retry_config.get("max_delay", 30.0),
+        )
+
+    def delay(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+def status_code(exc):
+    """HTTP status carried by an SDK/HTTP exception, if any."""
+    for attr in ("code", "status_code"):
+        code = getattr(exc, attr, None)
+        if isinstance(code, int):
+            return code
+    response = getattr(exc, "response", None)
+    code = getattr(response, "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_retryable(exc):
+    """429, 5xx and network-level failures are worth retrying; anything else is not."""
+    code = status_code(exc)
+    if code is not None:
+        return code in RETRYABLE_STATUS
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    # httpx/requests transport errors (connect/read timeouts, resets)
+    return type(exc).__name__ in ("ConnectError", "ReadTimeout", "ConnectTimeout", "RemoteProtocolError",
+                                  "ReadError", "WriteError", "PoolTimeout", "ConnectionError", "Timeout",
+                                  "ChunkedEncodingError")
+
+
+def call_with_retries(fn, policy=None, limiter=None, label="API call"):
+    """Calls fn() under the rate limiter, retrying transient failures per policy."""
+    policy = policy or RetryPolicy()
+    for attempt in range(policy.max_attempts):
+        if limiter:
+            limiter.acquire()
+        try:
+            return fn()
+        except Exception as e:
+            if not is_retryable(e) or attempt == policy.max_attempts - 1:
+                raise
+            delay = policy.delay(attempt)
+            count("api.retries")
+            print(f"{label} failed ({e}); retrying in {delay:.1f}s [{attempt + 1}/{policy.max_attempts}]")
+            time.sleep(delay)
+
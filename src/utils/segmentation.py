@@ -0,0 +1,94 @@
+# Bump when the grouping rules change so segmentation re-runs.
+SEGMENTATION_VERSION = 1
+
+
+def build_segments(timestamps, audio_duration=None):
+    """
+    Groups word timestamps into video segments.
+    Adds intro/outro segments for long silences at the edges and bridge
+    segments for instrumental gaps; lyric segments break on pauses > 0.5s
+    or after 5s.
+    """
+    segments = []
+
+    # 1. Intro
+    if timestamps:
+        first_start = timestamps[0]['start']
+        if first_start > 2.0: # If >2s gap at start
+            print(f"Adding Intro Segment (0.0 to {first_start:.2f}s)")
+            segments.append({
+                "words": [],
+                "text": "(Intro Music)",
+                "start": 0.0,
+                "end": first_start,
+                "type": "intro"
+            })
+
+    # 2. Group Words
+    if timestamps:
+        current_segment = {"words": [], "start": timestamps[0]["start"], "end": timestamps[0]["end"], "type": "lyrics"}
+
+        for i, w in enumerate(timestamps):
+            # Check for gap
+            is_gap = (w["start"] - current_segment["end"] > 0.5)
+            # Check for long segment duration (>5s)
+            is_long = (w["end"] - current_segment["start"] > 5.0)
+
+            if is_gap or is_long:
+                # Look ahead: is the gap HUGE? (Instrumental bridge)
+                gap_size = w["start"] - current_segment["end"]
+
+                if gap_size > 2.0:
+                     # 2a. Close current lyrics segment
+                     segments.append(current_segment)
+
+                     # 2b. Add Bridge Segment
+                     print(f"Adding Bridge Segment ({current_segment['end']:.2f} to {w['start']:.2f}s)")
+                     segments.append({
+                         "words": [],
+                         "text": "(Instrumental)",
+                         "start": current_segment['end'],
+                         "end": w["start"],
+                         "type": "bridge"
+                     })
+
+                     # 2c. Start new lyrics segment
+                     current_segment = {"words": [w], "start": w["start"], "end": w["end"], "type": "lyrics"}
+
+                else:
+                     # Normal line break.
+                     # EXTEND current segment end to next word start to avoid micro-black-gaps
+                     current_segment["end"] = w["start"]
+                     segments.append(current_segment)
+                     current_segment = {"words": [w], "start": w["start"], "end": w["end"], "type": "lyrics"}
+            else:
+                current_segment["words"].append(w)
+                current_segment["end"] = w["end"]
+
+        # Append last text segment
+        segments.append(current_segment)
+
+    # 3. Outro
+    if timestamps and audio_duration:
+        last_end = segments[-1]["end"]
+        if audio_duration - last_end > 2.0:
+             print(f"Adding Outro Segment ({last_end:.2f} to {audio_duration:.2f}s)")
+             segments.append({
+                 "words": [],
+                 "text": "(Outro Music)",
+                 "start": last_end,
+                 "end": audio_duration,
+                 "type": "outro"
+             })
+        # Ensure final segment stretches to exact duration to avoid drift/cutoff
+        elif audio_duration > last_end:
+             segments[-1]["end"] = audio_duration
+
+    # 4. Construct Text Fields for Visualizer
+    for seg in segments:
+        if seg["type"] == "lyrics":
+            seg["text"] = " ".join([w["word"] for w in seg["words"]])
+        # Ensure no missing text field
+        if "text" not in seg: seg["text"] = ""
+
+    return segments
@@ -0,0 +1,62 @@
+import json
+import os
+import threading
+import time
+
+
+class StepState:
+    """
+    Per-run record of which inputs each pipeline step last ran with.
+
+    Stored as <run dir>/state.json: for every completed step, the fingerprint
+    of its inputs (file hashes, config sections, upstream outputs, prompt
+    versions) and a digest of what it produced. A step is fresh when its
+    current fingerprint equals the recorded one and its artifacts exist;
+    because fingerprints embed upstream output digests, anything downstream
+    of a re-run step goes stale automatically.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._steps = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self._steps = json.load(f).get("steps", {})
+            except (OSError, ValueError) as e:
+                print(f"Warning: step state unreadable ({e}); all steps will re-run.")
+
+    def get(self, step):
+        with self._lock:
+            return self._steps.get(step)
+
+    def output(self, step):
+        """Output digest recorded by step, or None if it never completed."""
+        record = self.get(step)
+        return record["output"] if record else None
+
+    def status(self, step, inputs, artifacts=()):
+        """'fresh', 'changed' (ran before with other inputs) or 'new' (never completed)."""
+        record = self.get(step)
+        if record is None:
+            return "new"
+        if record["inputs"] != inputs or not all(os.path.exists(p) for p in artifacts):
+            return "changed"
+        return "fresh"
+
+    def record(self, step, inputs, output):
+        with self._lock:
+            self._steps[step] = {"inputs": inputs, "output": output, "completed_at": time.time()}
+            self._save()
+
+    def invalidate(self, step):
+        with self._lock:
+            if self._steps.pop(step, None) is not None:
+                self._save()
+
+    def _save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"steps": self._steps}, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
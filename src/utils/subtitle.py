@@ -33,3 +33,90 @@ def generate_srt(segments):
         index += 1
         
     return srt_content
+
+def format_ass_timestamp(seconds):
+    """Formats seconds into ASS timestamp format: H:MM:SS.cc"""
+    centis = int(round(max(0.0, seconds) * 100))
+    hours, centis = divmod(centis, 360000)
+    minutes, centis = divmod(centis, 6000)
+    secs, centis = divmod(centis, 100)
+    return f"{hours}:{minutes:02}:{secs:02}.{centis:02}"
+
+# Named colours accepted in config besides #RRGGBB
+ASS_COLOURS = {"white": "#FFFFFF", "black": "#000000", "yellow": "#FFFF00", "gold": "#FFD700", "red": "#FF0000"}
+
+def ass_colour(value):
+    """'#RRGGBB' or a name from ASS_COLOURS -> ASS '&H00BBGGRR'."""
+    rgb = ASS_COLOURS.get(str(value).lower(), str(value)).lstrip("#")
+    if len(rgb) != 6:
+        raise ValueError(f"Unsupported subtitle colour {value!r}; use #RRGGBB or one of {sorted(ASS_COLOURS)}")
+    return f"&H00{rgb[4:6]}{rgb[2:4]}{rgb[0:2]}".upper()
+
+def _ass_text(text):
+    # ASS has no escape for override braces; backslashes start tags
+    return text.replace("\\", "/").replace("{", "(").replace("}", ")").replace("\n", " ")
+
+def karaoke_line(seg):
+    """
+    Dialogue text for one segment with a \\kf tag per word, so each word
+    fills from the base colour to the highlight colour while it is sung.
+    Gaps between words get an empty \\k so later words stay in sync.
+    """
+    words = [w for w in seg.get("words", []) if w.get("word", "").strip()]
+    if not words:
+        return _ass_text(seg.get("text", "").strip())
+
+    # Work in centiseconds from the line start so rounding never accumulates across words
+    cursor = 0
+    parts = []
+    for w in words:
+        start = max(cursor, int(round((w["start"] - seg["start"]) * 100)))
+        end = max(start, int(round((w["end"] - seg["start"]) * 100)))
+        if start > cursor:
+            parts.append(f"{{\\k{start - cursor}}}")
+        parts.append(f"{{\\kf{end - start}}}{_ass_text(w['word'].strip())} ")
+        cursor = end
+    return "".join(parts).rstrip()
+
+def generate_ass(segments, resolution=(1080, 1920), font_name="Noto Sans Devanagari", font_size=60,
+                 color="white", highlight_color="gold", outline_color="black", outline_width=3, offset=0.0):
+    """
+    Generates ASS karaoke subtitles from segments (lyrics only).
+    Times are shifted by -offset, so a single segment rendered with
+    offset=seg["start"] is local to that segment's clip.
+    """
+    width, height = resolution
+    # Karaoke fills from SecondaryColour (not yet sung) to PrimaryColour (sung)
+    style = ",".join(str(v) for v in [
+        "Karaoke", font_name, font_size,
+        ass_colour(highlight_color), ass_colour(color), ass_colour(outline_color), "&H80000000",
+        0, 0, 0, 0, 100, 100, 0, 0,
+        1, outline_width, 0,
+        2, 40, 40, int(height * 0.15) - font_size, 1,
+    ])
+    ass_content = (
+        "[Script Info]\n"
+        "ScriptType: v4.00+\n"
+        f"PlayResX: {width}\n"
+        f"PlayResY: {height}\n"
+        "WrapStyle: 0\n"
+        "ScaledBorderAndShadow: yes\n"
+        "\n"
+        "[V4+ Styles]\n"
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+        "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, "
+        "BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding\n"
+        f"Style: {style}\n"
+        "\n"
+        "[Events]\n"
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
+    )
+    for seg in segments:
+        # Only include lyrics segments in subtitles
+        if seg.get("type", "lyrics") != "lyrics" or not seg.get("text", "").strip():
+            continue
+        start = seg.get("start", 0) - offset
+        end = seg.get("end", 0) - offset
+        ass_content += (f"Dialogue: 0,{format_ass_timestamp(start)},{format_ass_timestamp(end)},"
+                        f"Karaoke,,0,0,0,,{karaoke_line(seg)}\n")
+    return ass_content
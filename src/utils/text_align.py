@@ -0,0 +1,246 @@
+import unicodedata
+from functools import lru_cache
+
+# Marks that ASR output and hand-typed lyrics disagree on without changing the word
+_IGNORED_CHARS = {
+    "\u200c",  # zero width non-joiner
+    "\u200d",  # zero width joiner
+    "\u093c",  # Devanagari nukta (ज़ vs ज)
+}
+_EQUIVALENT_CHARS = {
+    "\u0901": "\u0902",  # chandrabindu -> anusvara
+    "\u0964": "",        # danda
+    "\u0965": "",        # double danda
+}
+
+# DP costs: skipping an ASR word (hallucination) or a lyric token (missed word),
+# and the surcharge for explaining one word as two (split/merge).
+GAP_COST = 1.0
+SPLIT_MERGE_PENALTY = 0.1
+MATCH_THRESHOLD = 0.5
+
+
+@lru_cache(maxsize=65536)
+def normalize_token(word):
+    """Canonical form for matching: NFC, casefolded, no punctuation, lenient Devanagari marks."""
+    word = unicodedata.normalize("NFC", word).casefold()
+    # Decompose precomposed nukta letters so the nukta can be dropped
+    word = unicodedata.normalize("NFD", word)
+    out = []
+    for ch in word:
+        if ch in _IGNORED_CHARS:
+            continue
+        ch = _EQUIVALENT_CHARS.get(ch, ch)
+        if not ch or unicodedata.category(ch)[0] in "PSZ":
+            continue
+        out.append(ch)
+    return unicodedata.normalize("NFC", "".join(out))
+
+
+def tokenize_lyrics(text):
+    """Whitespace tokens of the lyrics that contain at least one letter/digit."""
+    return [tok for tok in text.split() if normalize_token(tok)]
+
+
+@lru_cache(maxsize=262144)
+def similarity(a, b):
+    """1 - normalized Levenshtein distance between two normalized tokens."""
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return 1.0 - previous[-1] / len(a)
+
+
+def _band(n, m, width):
+    """Per-row [lo, hi] lyric index window around the diagonal of an n x m table."""
+    bounds = []
+    for i in range(n + 1):
+        center = round(i * m / n) if n else 0
+        bounds.append((max(0, center - width), min(m, center + width)))
+    return bounds
+
+
+def _align_span(a_norm, l_norm, band_width=None):
+    """
+    Banded edit-distance DP between two token lists.
+    Returns the backtracked operations as (op, i, j) tuples in order, where
+    i/j are the ASR/lyric positions *after* the op.
+    """
+    n, m = len(a_norm), len(l_norm)
+    if not n:
+        return [("skip_lyric", 0, j) for j in range(1, m + 1)]
+    if not m:
+        return [("skip_asr", i, 0) for i in range(1, n + 1)]
+
+    width = band_width or max(30, abs(n - m) + 15)
+    bounds = _band(n, m, width)
+    INF = float("inf")
+
+    # cost[i][j - lo_i], back[i][j - lo_i] = (op, di, dj)
+    cost = []
+    back = []
+    for i in range(n + 1):
+        lo, hi = bounds[i]
+        cost.append([INF] * (hi - lo + 1))
+        back.append([None] * (hi - lo + 1))
+
+    def get(i, j):
+        lo, hi = bounds[i]
+        return cost[i][j - lo] if lo <= j <= hi else INF
+
+    cost[0][0 - bounds[0][0]] = 0.0
+    for i in range(n + 1):
+        lo, hi = bounds[i]
+        row, brow = cost[i], back[i]
+        for j in range(lo, hi + 1):
+            if i == 0 and j == 0:
+                continue
+            best, op = INF, None
+            if i > 0 and j > 0:
+                c = get(i - 1, j - 1) + 1.0 - similarity(a_norm[i - 1], l_norm[j - 1])
+                if c < best:
+                    best, op = c, ("match", 1, 1)
+            if i > 0:
+                c = get(i - 1, j) + GAP_COST
+                if c < best:
+                    best, op = c, ("skip_asr", 1, 0)
+            if j > 0:
+                c = get(i, j - 1) + GAP_COST
+                if c < best:
+                    best, op = c, ("skip_lyric", 0, 1)
+            if i > 0 and j > 1:
+                c = get(i - 1, j - 2) + 1.0 - similarity(a_norm[i - 1], l_norm[j - 2] + l_norm[j - 1]) + SPLIT_MERGE_PENALTY
+                if c < best:
+                    best, op = c, ("split", 1, 2)
+            if i > 1 and j > 0:
+                c = get(i - 2, j - 1) + 1.0 - similarity(a_norm[i - 2] + a_norm[i - 1], l_norm[j - 1]) + SPLIT_MERGE_PENALTY
+                if c < best:
+                    best, op = c, ("merge", 2, 1)
+            row[j - lo] = best
+            brow[j - lo] = op
+
+    if get(n, m) == INF:
+        # Band too narrow for this span; retry unbanded
+        return _align_span(a_norm, l_norm, band_width=max(n, m))
+
+    ops = []
+    i, j = n, m
+    while i > 0 or j > 0:
+        op, di, dj = back[i][j - bounds[i][0]]
+        ops.append((op, i, j))
+        i -= di
+        j -= dj
+    ops.reverse()
+    return ops
+
+
+def align_words(asr_words, lyrics_text, band_width=None):
+    """
+    Aligns ASR words (dicts with word/start/end[/score]) to the ground-truth lyrics.
+
+    A banded edit-distance DP aligns the whole sequence: tokens match 1:1,
+    one ASR word splits into two lyric tokens, two ASR words merge into one
+    token, or words are skipped on either side. Every lyric token is returned
+    with the original lyric spelling; tokens without an ASR counterpart get
+    timestamps interpolated from their neighbours. Returns (words, stats), with
+    words None if nothing could be matched.
+    """
+    lyrics = tokenize_lyrics(lyrics_text)
+    asr = [w for w in asr_words if normalize_token(w.get("word", ""))]
+    n, m = len(asr), len(lyrics)
+    stats = {"lyric_tokens": m, "asr_words": n, "matched": 0, "interpolated": 0, "match_ratio": 0.0}
+    if not n or not m:
+        return None, stats
+
+    a_norm = [normalize_token(w["word"]) for w in asr]
+    l_norm = [normalize_token(t) for t in lyrics]
+
+    # No exact-run anchoring: with repeated lines (choruses) the longest common
+    # run can pair an ASR chorus with the wrong repetition in the lyrics. The DP
+    # stays near the diagonal and charges for every skipped word, so it keeps
+    # each repetition with its own.
+    ops = _align_span(a_norm, l_norm, band_width)
+
+    # Per-lyric-token timings
+    timed = [None] * m
+    for op, i, j in ops:
+        if op == "match":
+            w = asr[i - 1]
+            sim = similarity(a_norm[i - 1], l_norm[j - 1])
+            timed[j - 1] = (w["start"], w["end"], w.get("score", 0), sim)
+        elif op == "split":
+            w = asr[i - 1]
+            sim = similarity(a_norm[i - 1], l_norm[j - 2] + l_norm[j - 1])
+            first = len(l_norm[j - 2]) / (len(l_norm[j - 2]) + len(l_norm[j - 1]))
+            mid = w["start"] + (w["end"] - w["start"]) * first
+            timed[j - 2] = (w["start"], mid, w.get("score", 0), sim)
+            timed[j - 1] = (mid, w["end"], w.get("score", 0), sim)
+        elif op == "merge":
+            w1, w2 = asr[i - 2], asr[i - 1]
+            sim = similarity(a_norm[i - 2] + a_norm[i - 1], l_norm[j - 1])
+            score = (w1.get("score", 0) + w2.get("score", 0)) / 2
+            timed[j - 1] = (w1["start"], w2["end"], score, sim)
+
+    words = []
+    for tok, t in zip(lyrics, timed):
+        if t and t[3] >= MATCH_THRESHOLD:
+            stats["matched"] += 1
+        if t:
+            words.append({"word": tok, "start": t[0], "end": t[1], "score": t[2]})
+        else:
+            words.append({"word": tok, "start": None, "end": None, "score": 0.0, "interpolated": True})
+    stats["match_ratio"] = stats["matched"] / m
+
+    if all(w["start"] is None for w in words):
+        return None, stats
+    stats["interpolated"] = interpolate_missing(words)
+    return words, stats
+
+
+def interpolate_missing(words, default_duration=0.3):
+    """
+    Fills start/end of words that have none by spreading each run of them
+    evenly over the gap between their timed neighbours (sharing the previous
+    word's span when the gap is too small). Returns how many were filled.
+    """
+    filled = 0
+    k = 0
+    while k < len(words):
+        if words[k]["start"] is not None:
+            k += 1
+            continue
+        run_start = k
+        while k < len(words) and words[k]["start"] is None:
+            k += 1
+        run = words[run_start:k]
+        prev = words[run_start - 1] if run_start > 0 else None
+        nxt = words[k] if k < len(words) else None
+
+        if prev and nxt:
+            gap_start, gap_end = prev["end"], nxt["start"]
+            if gap_end - gap_start < 0.05 * len(run):
+                # No room: the run shares the previous word's time
+                gap_start = (prev["start"] + prev["end"]) / 2
+                prev["end"] = gap_start
+        elif nxt:
+            gap_end = nxt["start"]
+            gap_start = max(0.0, gap_end - default_duration * len(run))
+        else:
+            gap_start = prev["end"]
+            gap_end = gap_start + default_duration * len(run)
+
+        step = (gap_end - gap_start) / len(run)
+        for idx, w in enumerate(run):
+            w["start"] = round(gap_start + idx * step, 3)
+            w["end"] = round(gap_start + (idx + 1) * step, 3)
+        filled += len(run)
+    return filled
@@ -0,0 +1,153 @@
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+
+# Active trace and innermost span for the current thread/task. Thread pools
+# don't inherit these; wrap submitted callables with bind().
+_trace = contextvars.ContextVar("trace", default=None)
+_span = contextvars.ContextVar("span", default=None)
+
+
+class Trace:
+    """
+    Spans and counters for one run.
+
+    Spans are wall-clock intervals (step, LLM call, Veo operation, ffmpeg
+    encode...) with a category and free-form args; counters are running
+    totals (API calls, tokens, bytes downloaded). Exported as Chrome trace
+    JSON (chrome://tracing, ui.perfetto.dev) and as a text summary.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.time()
+        self.spans = []
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, name, start, end, cat="run", tid=None, args=None):
+        with self._lock:
+            self.spans.append({"name": name, "cat": cat, "start": start, "end": end,
+                               "tid": tid or threading.get_ident(), "args": args or {}})
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def chrome_events(self):
+        """Complete ("X") events, microseconds from the start of the run; one row per thread."""
+        with self._lock:
+            spans = list(self.spans)
+            counters = dict(self.counters)
+        threads = {}
+        events = [{"name": "process_name", "ph": "M", "pid": 1, "args": {"name": self.name}}]
+        for s in sorted(spans, key=lambda s: s["start"]):
+            tid = threads.setdefault(s["tid"], len(threads) + 1)
+            events.append({
+                "name": s["name"], "cat": s["cat"], "ph": "X", "pid": 1, "tid": tid,
+                "ts": round((s["start"] - self.started) * 1e6),
+                "dur": round((s["end"] - s["start"]) * 1e6),
+                "args": s["args"],
+            })
+        end = max([s["end"] for s in spans] + [self.started])
+        events.append({"name": "counters", "ph": "C", "pid": 1, "ts": round((end - self.started) * 1e6),
+                       "args": counters})
+        return events
+
+    def export(self, path):
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"traceEvents": self.chrome_events(), "displayTimeUnit": "ms"}, f)
+        os.replace(tmp, path)
+        return path
+
+    def summary(self):
+        """Per-span-name totals plus the headline counters, as a text table."""
+        with self._lock:
+            spans = list(self.spans)
+            counters = dict(self.counters)
+        wall = max([s["end"] for s in spans] + [time.time()]) - self.started
+
+        totals = {}
+        for s in spans:
+            t = totals.setdefault((s["cat"], s["name"]), [0, 0.0, 0.0])
+            duration = s["end"] - s["start"]
+            t[0] += 1
+            t[1] += duration
+            t[2] = max(t[2], duration)
+
+        lines = [f"=== Trace: {self.name} ({wall:.1f}s wall) ===",
+                 f"  {'category':10} {'span':28} {'count':>6} {'total s':>9} {'max s':>8}"]
+        for (cat, name), (n, total, longest) in sorted(totals.items(), key=lambda kv: -kv[1][1]):
+            lines.append(f"  {cat:10} {name[:28]:28} {n:6d} {total:9.2f} {longest:8.2f}")
+
+        if counters:
+            lines.append("  counters:")
+            for name, value in sorted(counters.items()):
+                lines.append(f"    {name:30} {value:,.0f}" if value >= 100 else f"    {name:30} {value:g}")
+        media, encode = counters.get("encode.media_s"), counters.get("encode.wall_s")
+        if media and encode:
+            lines.append(f"    {'encode realtime factor':30} {media / encode:.2f}x")
+        return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def activate(trace):
+    """Makes `trace` the current trace for this context (and for bind()-wrapped work)."""
+    token = _trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _trace.reset(token)
+
+
+def current():
+    return _trace.get()
+
+
+@contextlib.contextmanager
+def span(name, cat="run", **args):
+    """
+    Records the enclosed block as a span of the current trace; a no-op
+    without one. Yields the args dict so the block can add results.
+    """
+    trace = _trace.get()
+    if trace is None:
+        yield args
+        return
+    args["parent"] = _span.get()
+    token = _span.set(name)
+    start = time.time()
+    try:
+        yield args
+    except BaseException as e:
+        args["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _span.reset(token)
+        trace.add_span(name, start, time.time(), cat=cat, args=args)
+
+
+def add_span(name, start, end, cat="run", **args):
+    """Records an interval measured elsewhere (e.g. a Veo job from submit to download)."""
+    trace = _trace.get()
+    if trace is not None:
+        trace.add_span(name, start, end, cat=cat, args=args)
+
+
+def count(name, value=1):
+    """Adds value to counter `name` of the current trace, if any."""
+    trace = _trace.get()
+    if trace is not None and value:
+        trace.count(name, value)
+
+
+def bind(fn):
+    """Wraps fn to run in a copy of the caller's context, so spans made in pool threads land in this trace."""
+    ctx = contextvars.copy_context()
+    def run(*args, **kwargs):
+        return ctx.copy().run(fn, *args, **kwargs)
+    return run
@@ -1,31 +1,76 @@
 import ffmpeg
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from src.utils.file_cache import cache_root, hash_file, hash_key, link_or_copy, shared_cache
+from src.utils.trace import bind, count, span
+from src.video.conform import Conformer
+from src.video.encoders import load_profile
+from src.video.motion import KenBurns, run_piped
+
+# Bump when the clip filter graph changes so cached clips are re-rendered.
+CLIP_RENDER_VERSION = 1
 
 class VideoCompositor:
-    def __init__(self, config):
+    def __init__(self, config, draft=False):
         self.config = config
         self.resolution = tuple(config.get("video", {}).get("resolution", (1080, 1920)))
         self.fps = config.get("video", {}).get("fps", 30)
+        # Draft: reduced size/fps and a fast preset for checking sync and pacing;
+        # clips and their cache live apart from the final ones
+        self.draft = draft
+        self.text_scale = 1.0
+        # Encoder profiles (see src/video/encoders.py): one for the intermediate clips and,
+        # unless final is "copy", one for a single re-encode of the concatenated clips
+        encoders_config = config.get("encoders", {})
+        self.intermediate_profile = encoders_config.get("intermediate", "balanced")
+        self.final_profile = encoders_config.get("final", "copy")
+        if draft:
+            draft_config = config.get("draft", {})
+            self.text_scale = draft_config.get("scale", 0.25)
+            # libx264 with yuv420p needs even dimensions
+            self.resolution = tuple(max(2, int(v * self.text_scale) // 2 * 2) for v in self.resolution)
+            self.fps = draft_config.get("fps", 15)
+            self.intermediate_profile = draft_config.get("profile", "draft")
+            self.final_profile = "copy"
+        self.encoder_args = load_profile(config, self.intermediate_profile)
+        self.final_args = None if self.final_profile == "copy" else load_profile(config, self.final_profile)
+        # Parallel clip rendering: N ffmpeg workers, each x264 encoder capped at x264_threads
+        self.x264_threads = config.get("video", {}).get("x264_threads", 4)
+        self.render_workers = config.get("video", {}).get("render_workers") or self._default_workers()
+        # Content-addressed cache of intermediate clips, shared across runs
+        cache_config = config.get("cache", {})
+        self.clip_cache_enabled = cache_config.get("clips", True)
+        self.clip_cache_dir = os.path.join(cache_root(config), "clips_draft" if draft else "clips")
+        self.clip_cache_max_bytes = int(cache_config.get("clips_max_mb", 10240) * 1024 * 1024)
+        self.motion = KenBurns(config, resolution=self.resolution, fps=self.fps)
+        self.conformer = Conformer(config, resolution=self.resolution)
+
+    def _default_workers(self):
+        """One ffmpeg worker per x264_threads cores."""
+        return max(1, (os.cpu_count() or 1) // max(1, self.x264_threads))
 
     def create_video(self, segments, audio_path, output_path):
         """
         Combines images and text based on segments using strict Concat Demuxer.
-        1. Renders each segment as a temp .mp4 clip (Image + Zoom + Text).
+        1. Renders each segment as a temp .mp4 clip (Image + Zoom + Text/Captions), in parallel.
         2. Creates a concat list file.
         3. Muxes with original audio.
         """
-        import subprocess
-        
         # Ensure clips dir
-        clips_dir = os.path.join(os.path.dirname(output_path), "assets", "clips")
+        clips_dir = os.path.join(os.path.dirname(output_path), "assets", "clips_draft" if self.draft else "clips")
         os.makedirs(clips_dir, exist_ok=True)
         
-        clip_files = []
-        
-        print(f"Rendering {len(segments)} intermediate clips...")
         # Prepare concat inputs
         output_dir = os.path.dirname(output_path) # Define output_dir for new logic
         
+        clip_cache = None
+        if self.clip_cache_enabled:
+            clip_cache = shared_cache(self.clip_cache_dir, max_bytes=self.clip_cache_max_bytes, name="Clip cache")
+        
+        # 1. Resolve the work for every segment up front; clips are rendered below.
+        tasks = []
         for i, seg in enumerate(segments):
             if seg["type"] not in ["lyrics", "intro", "outro"]:
                 continue
@@ -48,77 +93,65 @@ class VideoCompositor:
                 print(f"Warning: Asset not found for segment {i}: {asset_path}")
                 continue
 
-            # Check if video or image
-            is_video = asset_path.endswith(".mp4")
-            
-            # Text Overlay if exists
-            # (Text renderer makes scene_XXX.png in assets/text/)
-            text_path = os.path.join(output_dir, "assets", "text", f"scene_{i:03d}.png")
-            has_text = os.path.exists(text_path)
+            # Text Overlay: the render step records where it wrote the overlay and where it goes
+            overlay = seg.get("text_overlay")
+            text_path, text_pos = None, (0, 0)
+            if overlay and os.path.exists(overlay["path"]):
+                text_path, text_pos = overlay["path"], (overlay.get("x", 0), overlay.get("y", 0))
+            elif overlay:
+                print(f"Warning: Text overlay not found for segment {i}: {overlay['path']}")
+
+            # Karaoke captions (clip-local ASS), burned in by the clip encode itself
+            captions = seg.get("captions")
+            if captions and not os.path.exists(captions["path"]):
+                print(f"Warning: Captions not found for segment {i}: {captions['path']}")
+                captions = None
             
-            # Create Clip with FFmpeg (Ken Burns for IMG, Scale/Trim for VIDEO)
             clip_name = f"clip_{i:03d}.mp4"
-            clip_full_path = os.path.join(clips_dir, clip_name)
-            
-            # Skip if exists (cache mechanism) - useful if re-running
-            # if os.path.exists(clip_full_path):
-            #     clip_files.append(clip_full_path)
-            #     continue
-            
+            tasks.append({
+                "index": i,
+                "asset_path": asset_path,
+                "text_path": text_path,
+                "text_pos": text_pos,
+                "captions": captions,
+                "variation": seg.get("variation"),
+                "duration": duration,
+                "clip_path": os.path.join(clips_dir, clip_name),
+            })
+        
+        self._probe_videos(segments, tasks)
+
+        workers = min(self.render_workers, len(tasks)) or 1
+        quality = f"draft {self.resolution[0]}x{self.resolution[1]}@{self.fps}" if self.draft else "final"
+        print(f"Rendering {len(tasks)} intermediate clips ({quality}) with {workers} worker(s)...")
+        
+        # Clips are collected by task position so the concat order is the segment order,
+        # regardless of which worker finishes first.
+        clip_files = [None] * len(tasks)
+        if workers == 1:
+            for pos, task in enumerate(tasks):
+                try:
+                    clip_files[pos] = self._render_cached_clip(task, clip_cache, x264_threads=None)
+                except Exception as e:
+                    raise self._render_error(task, e) from e
+        else:
+            pool = ThreadPoolExecutor(max_workers=workers)
+            render = bind(self._render_cached_clip)
+            futures = {pool.submit(render, task, clip_cache, self.x264_threads): pos for pos, task in enumerate(tasks)}
             try:
-                if is_video:
-                    # Video Input
-                    # Loop 5 times to be safe for duration > generated video duration
-                    vid = ffmpeg.input(asset_path, stream_loop=5)
-                    # Scale and Crop to Fill 1080x1920 (9:16)
-                    # scale=-1:1920 ensures height fits, w adapts. or 1080:-1.
-                    # force_original_aspect_ratio=increase ensures it fill box.
-                    vid = vid.filter('scale', 1080, 1920, force_original_aspect_ratio="increase")
-                    vid = vid.filter('crop', 1080, 1920)
-                    
-                    # Trim to exact segment duration
-                    base_stream = vid.trim(duration=duration).setpts('PTS-STARTPTS')
-                    
-                else:
-                    # Image Input (Ken Burns)
-                    frames = int(duration * self.fps)
-                    input_node = ffmpeg.input(asset_path, loop=1, t=duration)
-                    
-                    # Zoom Effect (Slow Zoom)
-                    base_stream = input_node.filter(
-                        'zoompan', 
-                        z='min(zoom+0.0015,1.5)', 
-                        d=frames, 
-                        x='iw/2-(iw/zoom/2)', 
-                        y='ih/2-(ih/zoom/2)', 
-                        s=f"{self.resolution[0]}x{self.resolution[1]}",
-                        fps=self.fps
-                    )
-
-                # Overlay Text
-                if has_text:
-                    txt_input = ffmpeg.input(text_path, loop=1, t=duration)
-                    video_stream = ffmpeg.overlay(base_stream, txt_input, x=0, y=0)
-                else:
-                    video_stream = base_stream
-                
-                # Force FPS
-                video_stream = video_stream.filter('fps', fps=self.fps, round='up')
-                
-                # Output
-                out = ffmpeg.output(
-                    video_stream, 
-                    clip_full_path, 
-                    vcodec='libx264', 
-                    pix_fmt='yuv420p', 
-                    t=duration  # Enforce exact duration
-                )
-                print(f"  Rendering Clip {i+1}: {clip_name} ({duration:.2f}s)")
-                out.run(overwrite_output=True, quiet=True)
-                clip_files.append(clip_full_path)
-            except ffmpeg.Error as e:
-                print(f"Error rendering clip {i}: {e.stderr.decode('utf8') if e.stderr else str(e)}")
-                raise e
+                for future in as_completed(futures):
+                    pos = futures[future]
+                    try:
+                        clip_files[pos] = future.result()
+                    except Exception as e:
+                        # Fail fast: drop queued clips and report the segment that broke.
+                        pool.shutdown(wait=True, cancel_futures=True)
+                        raise self._render_error(tasks[pos], e) from e
+            finally:
+                pool.shutdown(wait=True)
+        
+        if clip_cache:
+            print(clip_cache.summary())
 
         # 2. PROPER CONCAT via Demuxer File (Avoids filter graph complexity limits and OOM)
         concat_list_path = os.path.join(clips_dir, "concat_list.txt")
@@ -146,21 +179,180 @@ class VideoCompositor:
         # Update: Re-encoding is safer for 'shortest' logic if concat duration differs slightly.
         # But 'shortest' works best if we re-encode.
         
+        # encoders.final: "copy" keeps the clips' encode; a profile re-encodes once here
+        video_args = self.final_args or {'vcodec': 'copy'}
+        if self.final_args:
+            print(f"Final encode with profile '{self.final_profile}'...")
+        
         output = ffmpeg.output(
             input_video, 
             input_audio, 
             output_path, 
-            vcodec='copy', # Stream copy video only
             acodec='aac',  # Encode audio to aac
-            shortest=None
+            shortest=None,
+            **video_args
         )
         
         try:
-            output.run(overwrite_output=True, quiet=False)
+            with span("ffmpeg concat", cat="ffmpeg", clips=len(clip_files), reencode=bool(self.final_args)):
+                output.run(overwrite_output=True, quiet=False)
             print("Video Render Complete.")
         except ffmpeg.Error as e:
             print("FFmpeg Error (Concat):", e.stderr.decode('utf8') if e.stderr else str(e))
             raise e
 
+    def _probe_videos(self, segments, tasks):
+        """
+        Probes every video asset once, reusing seg["asset_probe"] while the
+        file is unchanged, and stores the result back in the segment record.
+        """
+        video_tasks = [t for t in tasks if t["asset_path"].endswith(".mp4")]
+        if not video_tasks:
+            return
+        probe = lambda t: self.conformer.probe(t["asset_path"], segments[t["index"]].get("asset_probe"))
+        with ThreadPoolExecutor(max_workers=min(8, len(video_tasks))) as pool:
+            for task, result in zip(video_tasks, pool.map(bind(probe), video_tasks)):
+                task["probe"] = result
+                segments[task["index"]]["asset_probe"] = result
+
+    def _clip_cache_key(self, task):
+        """
+        Hashes everything that determines a clip's pixels: asset and overlay
+        contents, duration, output geometry and encoder settings.
+        """
+        return hash_key({
+            "version": CLIP_RENDER_VERSION,
+            "asset": hash_file(task["asset_path"]),
+            "asset_type": os.path.splitext(task["asset_path"])[1],
+            "motion": None if task.get("probe") else self.motion.signature(task["index"]),
+            "conform": self.conformer.signature(task["probe"], round(task["duration"], 3)) if task.get("probe") else None,
+            "text": hash_file(task["text_path"]) if task["text_path"] else None,
+            "text_pos": list(task["text_pos"]),
+            "captions": [hash_file(task["captions"]["path"]), task["captions"].get("fontsdir")] if task["captions"] else None,
+            "duration": round(task["duration"], 3),
+            "resolution": list(self.resolution),
+            "fps": self.fps,
+            "encoder": self.encoder_args,
+            "text_scale": self.text_scale,
+            "variation": task["variation"],
+        })
+
+    def _render_error(self, task, e):
+        """Same error for the serial and parallel paths, naming the segment that broke."""
+        return RuntimeError(f"Failed to render segment {task['index']+1} ({task['asset_path']}): {e}")
+
+    def _render_cached_clip(self, task, clip_cache, x264_threads=None):
+        """
+        Serves a clip from the cache when its inputs are unchanged, else renders and stores it.
+        """
+        if clip_cache is None:
+            return self._render_clip(task, x264_threads=x264_threads)
+        
+        key = self._clip_cache_key(task)
+        cached = clip_cache.get(key)
+        if cached:
+            print(f"  Cached Clip {task['index']+1}: {os.path.basename(task['clip_path'])}")
+            link_or_copy(cached, task["clip_path"])
+            return task["clip_path"]
+        
+        clip_path = self._render_clip(task, x264_threads=x264_threads)
+        clip_cache.put(key, clip_path, meta={
+            "segment": task["index"],
+            "asset_path": task["asset_path"],
+            "duration": task["duration"],
+        })
+        return clip_path
+
+    def _render_clip(self, task, x264_threads=None):
+        """
+        Renders one segment to its intermediate clip and returns the clip path.
+        """
+        i = task["index"]
+        asset_path = task["asset_path"]
+        text_path = task["text_path"]
+        text_x, text_y = task["text_pos"]
+        duration = task["duration"]
+        clip_full_path = task["clip_path"]
+        
+        # Check if video or image
+        is_video = asset_path.endswith(".mp4")
+        frames = None
+        
+        # Create Clip with FFmpeg (Ken Burns for IMG, Scale/Trim for VIDEO)
+        try:
+            if is_video:
+                # Video Input: trimmed, slowed, ping-ponged or looped to fit (see Conformer)
+                base_stream = self.conformer.stream(asset_path, task["probe"], duration)
+            elif self.motion.backend == "zoompan":
+                base_stream = self.motion.zoompan_stream(asset_path, duration)
+            else:
+                # Image Input (Ken Burns): frames are generated here and piped in
+                frames = self.motion.frames(asset_path, i, duration)
+                base_stream = self.motion.input_stream()
+
+            # Repeated lines reuse an earlier asset; vary it cheaply so the repeat isn't a carbon copy
+            if task["variation"] == "mirror":
+                base_stream = base_stream.hflip()
+            elif task["variation"] == "offset":
+                width, height = self.resolution
+                base_stream = base_stream.filter('scale', int(width * 1.1) // 2 * 2, int(height * 1.1) // 2 * 2)
+                base_stream = base_stream.filter('crop', width, height, x='(iw-ow)/4', y='(ih-oh)/4')
+
+            # Overlay Text
+            if text_path:
+                txt_input = ffmpeg.input(text_path, loop=1, t=duration)
+                if self.text_scale != 1.0:
+                    # Overlays are drawn for the full-size frame
+                    txt_input = txt_input.filter('scale', f"iw*{self.text_scale}", f"ih*{self.text_scale}")
+                    text_x, text_y = round(text_x * self.text_scale), round(text_y * self.text_scale)
+                video_stream = ffmpeg.overlay(base_stream, txt_input, x=text_x, y=text_y)
+            else:
+                video_stream = base_stream
+            
+            # Force FPS
+            video_stream = video_stream.filter('fps', fps=self.fps, round='up')
+
+            # Burn in karaoke captions (libass; complex shaping for Devanagari)
+            captions = task["captions"]
+            if captions:
+                ass_args = {"shaping": "complex"}
+                if captions.get("fontsdir"):
+                    ass_args["fontsdir"] = captions["fontsdir"]
+                video_stream = video_stream.filter('ass', captions["path"], **ass_args)
+            
+            # Limit encoder threads when several clips encode side by side
+            # (a profile's own thread count wins)
+            encoder_args = dict(self.encoder_args)
+            if x264_threads and 'threads' not in encoder_args:
+                encoder_args['threads'] = x264_threads
+            
+            # Output
+            out = ffmpeg.output(
+                video_stream, 
+                clip_full_path, 
+                t=duration,  # Enforce exact duration
+                **encoder_args
+            )
+            print(f"  Rendering Clip {i+1}: {os.path.basename(clip_full_path)} ({duration:.2f}s)")
+            # Unlink first: the old clip may be a hardlink into the clip cache,
+            # and ffmpeg would otherwise truncate the cached copy in place.
+            if os.path.exists(clip_full_path):
+                os.remove(clip_full_path)
+            with span("ffmpeg clip", cat="ffmpeg", segment=i+1, media_s=round(duration, 3),
+                      source="video" if is_video else self.motion.backend) as span_args:
+                started = time.time()
+                if frames is not None:
+                    run_piped(out, frames)
+                else:
+                    out.run(overwrite_output=True, quiet=True)
+                elapsed = time.time() - started
+                span_args["encode_fps"] = round(duration * self.fps / elapsed, 1) if elapsed else None
+            count("encode.media_s", duration)
+            count("encode.wall_s", elapsed)
+            return clip_full_path
+        except ffmpeg.Error as e:
+            print(f"Error rendering clip {i}: {e.stderr.decode('utf8') if e.stderr else str(e)}")
+            raise e
+
 if __name__ == "__main__":
     pass
@@ -0,0 +1,93 @@
+import math
+
+import ffmpeg
+
+from src.utils.file_cache import hash_file
+
+# Bump when strategies or their filter graphs change so cached clips are re-rendered.
+CONFORM_VERSION = 1
+
+
+class Conformer:
+    """
+    Fits a generated video asset to its segment's duration and the output size.
+
+    Each asset is probed once (duration, size, fps); the probe is kept in the
+    segment record and reused while the file's hash is unchanged. The
+    strategy is the cheapest that covers the segment:
+      trim     - asset is long enough; decode only `duration` seconds
+      slow     - slightly short; stretch timestamps (up to conform.max_slowdown)
+      pingpong - up to 2x short; play forward then the needed tail in reverse
+      loop     - anything longer; loop exactly as many times as needed
+    Scale/crop is skipped when the asset already has the output size.
+    """
+
+    def __init__(self, config, resolution=None):
+        conform_config = config.get("conform", {})
+        self.resolution = tuple(resolution or config.get("video", {}).get("resolution", (1080, 1920)))
+        self.max_slowdown = conform_config.get("max_slowdown", 1.25)
+        self.pingpong = conform_config.get("pingpong", True)
+
+    def probe(self, path, cached=None):
+        """Duration/size/fps of a video; `cached` (a previous probe) is reused if the file is unchanged."""
+        digest = hash_file(path)
+        if cached and cached.get("hash") == digest:
+            return cached
+        info = ffmpeg.probe(path)
+        stream = next(s for s in info["streams"] if s.get("codec_type") == "video")
+        num, _, den = stream.get("avg_frame_rate", "0/1").partition("/")
+        fps = float(num) / float(den or 1) if float(den or 1) else 0.0
+        duration = float(stream.get("duration") or info.get("format", {}).get("duration") or 0)
+        return {
+            "hash": digest,
+            "duration": duration,
+            "width": int(stream["width"]),
+            "height": int(stream["height"]),
+            "fps": fps,
+        }
+
+    def plan(self, probe, duration):
+        """Strategy for covering `duration` seconds with the probed asset."""
+        source = probe["duration"]
+        if source <= 0 or source >= duration:
+            return {"strategy": "trim"}
+        ratio = duration / source
+        if ratio <= self.max_slowdown:
+            return {"strategy": "slow", "factor": round(ratio, 6)}
+        if self.pingpong and ratio <= 2:
+            return {"strategy": "pingpong"}
+        return {"strategy": "loop", "loops": math.ceil(ratio) - 1}
+
+    def signature(self, probe, duration):
+        """Everything that determines the conformed stream, for cache keys."""
+        return {"version": CONFORM_VERSION, **self.plan(probe, duration),
+                "scaled": (probe["width"], probe["height"]) != self.resolution}
+
+    def stream(self, path, probe, duration):
+        """ffmpeg video stream of exactly `duration` seconds at the output size, starting at PTS 0."""
+        plan = self.plan(probe, duration)
+        source = probe["duration"]
+        strategy = plan["strategy"]
+
+        if strategy == "trim":
+            # Input-side t: the decoder stops at the segment length
+            vid = ffmpeg.input(path, t=duration).video
+        elif strategy == "slow":
+            vid = ffmpeg.input(path).video.setpts(f"{plan['factor']}*PTS")
+        elif strategy == "pingpong":
+            # Only the tail that is replayed gets buffered by 'reverse'
+            tail = duration - source
+            fwd, back = ffmpeg.input(path).video.split()
+            back = back.trim(start=max(0.0, source - tail)).setpts('PTS-STARTPTS').filter('reverse')
+            vid = ffmpeg.concat(fwd, back, v=1, a=0)
+        else:
+            vid = ffmpeg.input(path, stream_loop=plan["loops"], t=duration).video
+
+        if (probe["width"], probe["height"]) != self.resolution:
+            width, height = self.resolution
+            # force_original_aspect_ratio=increase fills the box; crop trims the overflow
+            vid = vid.filter('scale', width, height, force_original_aspect_ratio="increase")
+            vid = vid.filter('crop', width, height)
+
+        # Trim to exact segment duration
+        return vid.trim(duration=duration).setpts('PTS-STARTPTS')
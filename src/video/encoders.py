@@ -0,0 +1,33 @@
+# Built-in encoder profiles; config.yaml `encoders.profiles` entries override or add to these.
+DEFAULT_PROFILES = {
+    # libx264 defaults: what clips were always encoded with
+    "balanced": {"codec": "libx264", "preset": "medium", "crf": 23},
+    "fast": {"codec": "libx264", "preset": "veryfast", "crf": 23},
+    # Intra-only, near-lossless intermediates: cheap to encode and to cut, meant
+    # to be re-encoded once on concat (encoders.final) rather than shipped
+    "intra": {"codec": "libx264", "preset": "ultrafast", "crf": 12, "gop": 1},
+    "draft": {"codec": "libx264", "preset": "ultrafast", "crf": 30},
+    "high": {"codec": "libx264", "preset": "slow", "crf": 18, "tune": "animation", "gop": 60},
+}
+
+# Profile keys and the ffmpeg output options they map to
+PROFILE_OPTIONS = {"codec": "vcodec", "pix_fmt": "pix_fmt", "preset": "preset", "crf": "crf",
+                   "tune": "tune", "gop": "g", "threads": "threads"}
+
+
+def load_profile(config, name):
+    """
+    ffmpeg output kwargs for encoder profile `name` (codec, preset, CRF,
+    tune, GOP, threads). Unset keys are left to the encoder's defaults.
+    """
+    profiles = dict(DEFAULT_PROFILES)
+    profiles.update(config.get("encoders", {}).get("profiles") or {})
+    if name not in profiles:
+        raise ValueError(f"Unknown encoder profile '{name}'; choose from {sorted(profiles)}")
+
+    profile = {"codec": "libx264", "pix_fmt": "yuv420p"}
+    profile.update(profiles[name])
+    unknown = [k for k in profile if k not in PROFILE_OPTIONS]
+    if unknown:
+        raise ValueError(f"Encoder profile '{name}' has unknown option(s) {unknown}; use {sorted(PROFILE_OPTIONS)}")
+    return {PROFILE_OPTIONS[k]: v for k, v in profile.items() if v is not None}
@@ -0,0 +1,157 @@
+import math
+import random
+
+import ffmpeg
+import numpy as np
+from PIL import Image
+
+# Bump when paths or frame generation change so cached clips are re-rendered.
+MOTION_VERSION = 1
+
+# Easing curves over normalized time t in [0, 1]
+CURVES = {
+    "linear": lambda t: t,
+    "ease_in": lambda t: t * t,
+    "ease_out": lambda t: 1 - (1 - t) ** 2,
+    "ease_in_out": lambda t: 0.5 - 0.5 * np.cos(np.pi * t),
+}
+
+# Camera moves: (zoom_from, zoom_to, center_from, center_to). Zoom 1 shows
+# the whole frame, "max" is motion.zoom; centers run 0..1 across the range
+# that keeps the window inside the image.
+MOVES = {
+    "zoom_in": (1, "max", (0.5, 0.5), (0.5, 0.5)),
+    "zoom_out": ("max", 1, (0.5, 0.5), (0.5, 0.5)),
+    "pan_left": ("max", "max", (1.0, 0.5), (0.0, 0.5)),
+    "pan_right": ("max", "max", (0.0, 0.5), (1.0, 0.5)),
+    "pan_up": ("max", "max", (0.5, 1.0), (0.5, 0.0)),
+    "pan_down": ("max", "max", (0.5, 0.0), (0.5, 1.0)),
+}
+
+
+class KenBurns:
+    """
+    Pan/zoom motion for still images.
+
+    The still is cover-fitted once to an oversampled working size; every
+    output frame is then a sub-pixel crop of it resampled straight to the
+    output size (Pillow resize with a float box), and the raw frames are
+    piped into the clip encode. zoompan instead rescales the full source
+    for every frame and snaps the window to whole pixels, which is slow and
+    jitters on slow moves. backend "zoompan" keeps the old filter graph.
+    """
+
+    def __init__(self, config, resolution=None, fps=None):
+        motion_config = config.get("motion", {})
+        video_config = config.get("video", {})
+        self.resolution = tuple(resolution or video_config.get("resolution", (1080, 1920)))
+        self.fps = fps or video_config.get("fps", 30)
+        self.backend = motion_config.get("backend", "frames")
+        self.zoom = motion_config.get("zoom", 1.2)
+        self.oversample = motion_config.get("oversample", 1.5)
+        self.curve = motion_config.get("curve", "ease_in_out")
+        self.moves = motion_config.get("moves") or list(MOVES)
+        if self.curve not in CURVES:
+            raise ValueError(f"Unknown motion curve '{self.curve}'; choose from {sorted(CURVES)}")
+        unknown = [m for m in self.moves if m not in MOVES]
+        if unknown:
+            raise ValueError(f"Unknown motion move(s) {unknown}; choose from {sorted(MOVES)}")
+
+    def move_for(self, index):
+        """Deterministic per-segment move, so neighbouring segments vary but re-renders match."""
+        return random.Random(index).choice(self.moves)
+
+    def signature(self, index):
+        """Everything that determines segment `index`'s motion, for cache keys."""
+        if self.backend == "zoompan":
+            return {"backend": "zoompan"}
+        return {
+            "version": MOTION_VERSION,
+            "backend": self.backend,
+            "move": self.move_for(index),
+            "zoom": self.zoom,
+            "oversample": self.oversample,
+            "curve": self.curve,
+        }
+
+    def path(self, move, frames):
+        """Per-frame (zoom, center_x, center_y) arrays for a move, all float (sub-pixel)."""
+        z_from, z_to, c_from, c_to = MOVES[move]
+        z_from = self.zoom if z_from == "max" else z_from
+        z_to = self.zoom if z_to == "max" else z_to
+
+        t = np.linspace(0.0, 1.0, frames) if frames > 1 else np.zeros(1)
+        e = CURVES[self.curve](t)
+        # Geometric interpolation reads as constant-speed zoom
+        zoom = z_from * (z_to / z_from) ** e
+        cx = c_from[0] + (c_to[0] - c_from[0]) * e
+        cy = c_from[1] + (c_to[1] - c_from[1]) * e
+        # 0..1 spans the centers that keep the window inside the image at this zoom
+        half = 0.5 / zoom
+        return zoom, half + cx * (1 - 2 * half), half + cy * (1 - 2 * half)
+
+    def working_image(self, image_path):
+        """The still, cover-fitted and center-cropped to output size * oversample (done once)."""
+        out_w, out_h = self.resolution
+        work_w = int(round(out_w * self.oversample))
+        work_h = int(round(out_h * self.oversample))
+        img = Image.open(image_path).convert("RGB")
+        scale = max(work_w / img.width, work_h / img.height)
+        scaled_w = max(work_w, int(math.ceil(img.width * scale)))
+        scaled_h = max(work_h, int(math.ceil(img.height * scale)))
+        img = img.resize((scaled_w, scaled_h), Image.LANCZOS)
+        left = (scaled_w - work_w) // 2
+        top = (scaled_h - work_h) // 2
+        return img.crop((left, top, left + work_w, top + work_h))
+
+    def frames(self, image_path, index, duration):
+        """Yields rgb24 frame bytes for segment `index`."""
+        work = self.working_image(image_path)
+        count = max(1, int(round(duration * self.fps)))
+        zoom, cx, cy = self.path(self.move_for(index), count)
+        # Window boxes for all frames at once, in working-image pixels
+        box_w = work.width / zoom
+        box_h = work.height / zoom
+        x0 = cx * work.width - box_w / 2
+        y0 = cy * work.height - box_h / 2
+        boxes = np.stack([x0, y0, x0 + box_w, y0 + box_h], axis=1)
+        for box in boxes:
+            yield work.resize(self.resolution, Image.BILINEAR, box=tuple(float(v) for v in box)).tobytes()
+
+    def input_stream(self):
+        """ffmpeg input reading frames() from stdin."""
+        width, height = self.resolution
+        return ffmpeg.input('pipe:', format='rawvideo', pix_fmt='rgb24', s=f"{width}x{height}", framerate=self.fps)
+
+    def zoompan_stream(self, image_path, duration):
+        """The original zoompan graph (backend "zoompan")."""
+        frames = int(duration * self.fps)
+        input_node = ffmpeg.input(image_path, loop=1, t=duration)
+        return input_node.filter(
+            'zoompan',
+            z='min(zoom+0.0015,1.5)',
+            d=frames,
+            x='iw/2-(iw/zoom/2)',
+            y='ih/2-(ih/zoom/2)',
+            s=f"{self.resolution[0]}x{self.resolution[1]}",
+            fps=self.fps
+        )
+
+
+def run_piped(output, frames):
+    """Runs an ffmpeg output whose input is 'pipe:', feeding it frames; raises ffmpeg.Error on failure."""
+    process = output.global_args('-loglevel', 'error').run_async(pipe_stdin=True, pipe_stderr=True, overwrite_output=True)
+    try:
+        for frame in frames:
+            process.stdin.write(frame)
+    except BrokenPipeError:
+        pass  # ffmpeg exited early; its stderr says why
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+    finally:
+        process.stdin.close()
+    stderr = process.stderr.read()
+    if process.wait() != 0:
+        raise ffmpeg.Error('ffmpeg', None, stderr)
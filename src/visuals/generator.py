@@ -1,43 +1,126 @@
 import os
-import os
-from google import genai
-from google.genai import types
 from PIL import Image
 import io
 
+from src.utils.download import download
+from src.utils.file_cache import cache_root, hash_key, link_or_copy, shared_cache
+from src.utils.llm import genai_types, get_client, get_rate_limiter, get_retry_policy
+from src.utils.retry import call_with_retries
+from src.utils.trace import count, span
+
+def asset_store(config):
+    """
+    Cross-run store of generated images/videos (cache.assets), keyed by
+    model, prompt and generation config; None when disabled. One instance
+    per directory is shared by every poem in the process.
+    """
+    cache_config = config.get("cache", {})
+    if not cache_config.get("assets", True):
+        return None
+    max_age_days = cache_config.get("assets_max_age_days", 90)
+    return shared_cache(os.path.join(cache_root(config), "assets"),
+                        max_bytes=int(cache_config.get("assets_max_mb", 20480) * 1024 * 1024),
+                        max_age_s=max_age_days * 86400 if max_age_days else None,
+                        name="Asset store", sidecars=True)
+
 class ImageGenerator:
-    def __init__(self, api_key=None, model_name="imagen-4.0-generate-001"):
+    def __init__(self, api_key=None, model_name="imagen-4.0-generate-001", store=None):
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
-            raise ValueError("GEMINI_API_KEY not found for Image Generator.")
-        
-        # New Google GenAI SDK (v1)
-        self.client = genai.Client(api_key=self.api_key)
+
+        # New Google GenAI SDK (v1), shared process-wide (or the fake backend, see llm.backend);
+        # raises ValueError when a real client has no API key
+        self.client = get_client(self.api_key)
         self.model_name = model_name
+        # Generated assets shared across runs (see asset_store)
+        self.store = store
+
+    def _image_config(self, aspect_ratio):
+        return dict(number_of_images=1, aspect_ratio=aspect_ratio,
+                    safety_filter_level="block_low_and_above", person_generation="allow_adult")
+
+    def _video_config(self):
+        # We want 9:16 for vertical video.
+        # Types: "16:9", "9:16", "1:1" usually.
+        return dict(number_of_videos=1, aspect_ratio="9:16")
+
+    def _store_key(self, prompt, generation_config):
+        return hash_key({"model": self.model_name, "prompt": prompt, "config": generation_config})
+
+    def _source_key(self, source, generation_config):
+        return self._store_key({"source": source}, generation_config)
+
+    def _from_store(self, key, output_path):
+        """Links a stored asset into output_path; False on a miss."""
+        cached = self.store.get(key) if self.store else None
+        if not cached:
+            return False
+        link_or_copy(cached, output_path)
+        print(f"Reused stored asset -> {output_path}")
+        return True
+
+    def _to_store(self, key, output_path, prompt):
+        if self.store:
+            self.store.put(key, output_path, meta={"model": self.model_name, "prompt": prompt})
+
+    def fetch_stored_source(self, source, output_path, video=False):
+        """
+        Links an asset generated earlier from the same prompt inputs (see
+        VisualizerAgent.prompt_inputs) into output_path; False if there is none.
+        Unlike the prompt key, this hits without asking the LLM for a prompt again.
+        """
+        generation_config = self._video_config() if video else self._image_config("9:16")
+        return self._from_store(self._source_key(source, generation_config), output_path)
+
+    def fetch_stored_video(self, prompt, output_path):
+        """Links a previously generated clip for this prompt into output_path; False if there is none."""
+        return self._from_store(self._store_key(prompt, self._video_config()), output_path)
 
-    def generate_image(self, prompt, output_path, aspect_ratio="9:16"):
+    def store_video(self, prompt, output_path, source=None):
+        """Adds a freshly downloaded clip to the asset store (also under its prompt inputs, if given)."""
+        self._to_store(self._store_key(prompt, self._video_config()), output_path, prompt)
+        if source is not None:
+            self._to_store(self._source_key(source, self._video_config()), output_path, prompt)
+
+    def _clear(self, output_path):
+        # output_path may be a hardlink into the asset store; never write through it
+        if os.path.lexists(output_path):
+            os.remove(output_path)
+
+    def _call(self, fn, label):
+        """Runs an SDK call with the shared retry policy and this model's rate limit."""
+        return call_with_retries(fn, policy=get_retry_policy(), limiter=get_rate_limiter(self.model_name),
+                                 label=f"{label} ({self.model_name})")
+
+    def generate_image(self, prompt, output_path, aspect_ratio="9:16", source=None):
         """
-        Generates an image and saves it to output_path.
+        Generates an image and saves it to output_path. `source` (the prompt's
+        inputs) also indexes the stored image for fetch_stored_source.
         """
+        generation_config = self._image_config(aspect_ratio)
+        key = self._store_key(prompt, generation_config)
+        if self._from_store(key, output_path):
+            return True
+
         print(f"Generating image for prompt: {prompt[:50]}...")
+        self._clear(output_path)
         
         try:
-            response = self.client.models.generate_images(
-                model=self.model_name,
-                prompt=prompt,
-                config=types.GenerateImagesConfig(
-                    number_of_images=1,
-                    aspect_ratio=aspect_ratio,
-                    safety_filter_level="block_low_and_above",
-                    person_generation="allow_adult"
-                )
-            )
+            with span("imagen generate", cat="generate", model=self.model_name):
+                count("imagen.calls")
+                response = self._call(lambda: self.client.models.generate_images(
+                    model=self.model_name,
+                    prompt=prompt,
+                    config=genai_types().GenerateImagesConfig(**generation_config)
+                ), "Imagen")
             
             if response.generated_images:
                 # Save first image
                 image = response.generated_images[0].image
                 image.save(output_path)
                 print(f"Saved image to {output_path}")
+                self._to_store(key, output_path, prompt)
+                if source is not None:
+                    self._to_store(self._source_key(source, generation_config), output_path, prompt)
                 return True
             else:
                 print("No images returned.")
@@ -48,91 +131,105 @@ class ImageGenerator:
             # Mocking for now if API fails
             print("MOCK: Creating a placeholder image due to API error/unavailability.")
             img = Image.new('RGB', (1080, 1920), color = 'red')
+            # (never stored: the placeholder must not outlive this run)
+            self._clear(output_path)
             img.save(output_path)
             # return True # Return true to simulate success for mock, or False if critical
             return True
 
-    def generate_video(self, prompt, output_path, duration_seconds=5):
+    def submit_video(self, prompt, duration_seconds=5):
         """
-        Generates a video using Veo model.
+        Starts a Veo operation and returns it without waiting for the result.
         """
         print(f"Generating VIDEO for prompt: {prompt[:50]}... (Duration: {duration_seconds}s)")
-        import time
-        
-        try:
-            # Add aspect ratio if supported by Veo (it usually is)
-            # We want 9:16 for vertical video.
-            # Types: "16:9", "9:16", "1:1" usually.
-            
-            op = self.client.models.generate_videos(
+
+        with span("veo submit", cat="generate", model=self.model_name):
+            count("veo.submits")
+            op = self._call(lambda: self.client.models.generate_videos(
                 model=self.model_name,
                 prompt=prompt,
-                config=types.GenerateVideosConfig(
-                    number_of_videos=1,
-                    aspect_ratio="9:16" 
-                )
-            )
-            
-            print(f"Veo Operation started: {op.name}. Polling for result...")
-            
+                config=genai_types().GenerateVideosConfig(**self._video_config())
+            ), "Veo submit")
+        print(f"Veo Operation started: {op.name}")
+        return op
+
+    def refresh_operation(self, op):
+        """Reloads a Veo operation to pick up its latest status."""
+        # Polls are not rate limited: they don't count against generation quota
+        with span("veo poll", cat="generate"):
+            count("veo.polls")
+            return call_with_retries(lambda: self.client.operations.get(operation=op),
+                                     policy=get_retry_policy(), label="Veo poll")
+
+    def save_video_result(self, op, output_path):
+        """
+        Downloads the first video of a finished Veo operation to output_path.
+        """
+        with span("veo download", cat="download", path=os.path.basename(output_path)):
+            return self._save_video_result(op, output_path)
+
+    def _save_video_result(self, op, output_path):
+        response = op.response
+        # Accessing generated_videos attribute
+
+        if not (response and hasattr(response, 'generated_videos') and response.generated_videos):
+            print(f"No videos returned. Response: {response}")
+            return False
+
+        video = response.generated_videos[0].video
+        self._clear(output_path)
+
+        # Stream the file from its URI: chunked to disk, resumable, on the shared session
+        if getattr(video, 'uri', None):
+            headers = {}
+            if self.api_key:
+                headers["x-goog-api-key"] = self.api_key
+            try:
+                print(f"Downloading video content...")
+                download(video.uri, output_path, headers=headers, policy=get_retry_policy())
+                print(f"Saved video to {output_path}")
+                return True
+            except Exception as e:
+                print(f"Streamed download failed: {e}. Trying SDK download...")
+
+        # Fallback: SDK download (holds the whole clip in memory)
+        self.client.files.download(file=video)
+        if not hasattr(video, 'save'):
+            raise NotImplementedError("Video object has no save method after download.")
+        video.save(output_path)
+        count("download.bytes", os.path.getsize(output_path))
+        print(f"Saved video (SDK) to {output_path}")
+        return True
+
+    def generate_video(self, prompt, output_path, duration_seconds=5, max_wait_s=600):
+        """
+        Generates a video using Veo model.
+        Blocks until the single operation finishes; see VideoJobScheduler for batches.
+        """
+        import time
+
+        try:
+            if self.fetch_stored_video(prompt, output_path):
+                return True
+            op = self.submit_video(prompt, duration_seconds=duration_seconds)
+            print("Polling for result...")
+
             # Poll with timeout
             start_time = time.time()
-            max_wait_s = 600 # 10 minutes
-            
+            interval = 5
+
             while not op.done:
-                time.sleep(10)
+                time.sleep(interval)
+                interval = min(interval * 1.5, 30)
                 if time.time() - start_time > max_wait_s:
                     raise TimeoutError(f"Veo generation timed out after {max_wait_s}s")
                 # Reload operation
-                op = self.client.operations.get(operation=op)
-            
-            response = op.response
-            # Accessing generated_videos attribute
-            
-            if response and hasattr(response, 'generated_videos') and response.generated_videos:
-                video = response.generated_videos[0].video
-                
-                # Use SDK download first
-                try:
-                    print(f"Downloading video content...")
-                    self.client.files.download(file=video)
-                    
-                    if hasattr(video, 'save'):
-                        video.save(output_path)
-                        print(f"Saved video to {output_path}")
-                        return True
-                    else:
-                        raise NotImplementedError("Video object has no save method after download.")
-                        
-                except Exception as sdk_err:
-                    print(f"SDK download/save failed: {sdk_err}. Trying manual fallback...")
-                    
-                    # Fallback to manual download if SDK fails
-                    if hasattr(video, 'uri') and video.uri:
-                         import requests
-                         headers = {}
-                         if self.api_key:
-                             headers["x-goog-api-key"] = self.api_key
-                             
-                         r = requests.get(video.uri, headers=headers)
-                         r.raise_for_status()
-                         
-                         with open(output_path, "wb") as f:
-                             f.write(r.content)
-                         print(f"Saved video (manual fallback) to {output_path}")
-                         return True
-                    else:
-                        raise sdk_err
+                op = self.refresh_operation(op)
 
-            else:
-                print(f"No videos returned. Response: {response}")
+            if not self.save_video_result(op, output_path):
                 return False
-        except Exception as e:
-            print(f"Error generating video: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
-
+            self.store_video(prompt, output_path)
+            return True
         except Exception as e:
             print(f"Error generating video: {e}")
             import traceback
@@ -0,0 +1,159 @@
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from src.utils.trace import add_span, bind
+
+
+class VideoJob:
+    """One segment's Veo generation, tracked through submit -> poll -> download."""
+
+    def __init__(self, index, prompt, output_path, duration_seconds, source=None):
+        self.index = index
+        self.prompt = prompt
+        # Prompt inputs the clip is also stored under (None for fallback prompts)
+        self.source = source
+        self.output_path = output_path
+        self.duration_seconds = duration_seconds
+
+        self.op = None
+        self.status = "pending"  # pending, running, downloading, done, failed
+        self.error = None
+        self.submitted_at = None
+        self.finished_at = None
+        self.next_poll_at = 0.0
+        self.poll_interval = 0.0
+
+
+class VideoJobScheduler:
+    """
+    Runs many Veo operations concurrently.
+
+    All jobs are submitted up front (bounded by max_in_flight), polled together
+    from a single loop with per-job exponential backoff, and each clip is
+    downloaded on a worker thread as soon as its operation completes, so the
+    wall-clock time approaches that of the slowest clip rather than the sum.
+    """
+
+    def __init__(self, generator, max_in_flight=4, poll_interval=5, max_poll_interval=30,
+                 backoff=1.5, max_wait_s=600, download_workers=4):
+        self.generator = generator
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.backoff = backoff
+        self.max_wait_s = max_wait_s
+        self.download_workers = max(1, int(download_workers))
+
+    @classmethod
+    def from_config(cls, generator, config):
+        veo_config = config.get("veo", {})
+        return cls(
+            generator,
+            max_in_flight=veo_config.get("max_in_flight", 4),
+            poll_interval=veo_config.get("poll_interval", 5),
+            max_poll_interval=veo_config.get("max_poll_interval", 30),
+            max_wait_s=veo_config.get("timeout", 600),
+            download_workers=veo_config.get("download_workers", 4),
+        )
+
+    def run(self, jobs):
+        """
+        Executes all jobs and returns them with status 'done' or 'failed'.
+        """
+        pending = list(jobs)
+        running = []
+        downloads = {}
+
+        with ThreadPoolExecutor(max_workers=self.download_workers) as pool:
+            while pending or running or downloads:
+                now = time.time()
+
+                # 1. Fill free in-flight slots
+                while pending and len(running) + len(downloads) < self.max_in_flight:
+                    self._submit(pending.pop(0), running)
+
+                # 2. Poll operations that are due
+                for job in list(running):
+                    if job.next_poll_at > now:
+                        continue
+                    try:
+                        job.op = self.generator.refresh_operation(job.op)
+                    except Exception as e:
+                        self._fail(job, f"poll error: {e}")
+                        running.remove(job)
+                        continue
+
+                    if job.op.done:
+                        running.remove(job)
+                        job.status = "downloading"
+                        downloads[pool.submit(bind(self.generator.save_video_result), job.op, job.output_path)] = job
+                    elif now - job.submitted_at > self.max_wait_s:
+                        running.remove(job)
+                        self._fail(job, f"timed out after {self.max_wait_s}s")
+                    else:
+                        job.poll_interval = min(job.poll_interval * self.backoff, self.max_poll_interval)
+                        job.next_poll_at = now + job.poll_interval
+
+                # 3. Collect finished downloads
+                for future in [f for f in downloads if f.done()]:
+                    job = downloads.pop(future)
+                    try:
+                        ok = future.result()
+                    except Exception as e:
+                        traceback.print_exc()
+                        self._fail(job, f"download error: {e}")
+                        continue
+                    if ok:
+                        self.generator.store_video(job.prompt, job.output_path, source=job.source)
+                        job.status = "done"
+                        job.finished_at = time.time()
+                        add_span("veo job", job.submitted_at, job.finished_at, cat="veo", segment=job.index+1, status="done")
+                        print(f"  Segment {job.index+1}: done in {job.finished_at - job.submitted_at:.0f}s -> {job.output_path}")
+                    else:
+                        self._fail(job, "no video returned")
+
+                # 4. Sleep until the next poll is due or a download finishes
+                if running or downloads:
+                    timeout = None
+                    if running:
+                        timeout = max(min(j.next_poll_at for j in running) - time.time(), 0.0)
+                    if downloads:
+                        wait(downloads, timeout=timeout, return_when=FIRST_COMPLETED)
+                    else:
+                        time.sleep(timeout)
+
+        self._report(jobs)
+        return jobs
+
+    def _submit(self, job, running):
+        # Same prompt generated by an earlier run: no Veo call at all
+        if self.generator.fetch_stored_video(job.prompt, job.output_path):
+            job.status = "done"
+            job.submitted_at = job.finished_at = time.time()
+            return
+        try:
+            job.op = self.generator.submit_video(job.prompt, duration_seconds=job.duration_seconds)
+        except Exception as e:
+            self._fail(job, f"submit error: {e}")
+            return
+        job.status = "running"
+        job.submitted_at = time.time()
+        job.poll_interval = self.poll_interval
+        job.next_poll_at = job.submitted_at + job.poll_interval
+        running.append(job)
+
+    def _fail(self, job, reason):
+        job.status = "failed"
+        job.error = reason
+        job.finished_at = time.time()
+        if job.submitted_at:
+            add_span("veo job", job.submitted_at, job.finished_at, cat="veo", segment=job.index+1, status="failed", error=reason)
+        print(f"  Segment {job.index+1}: FAILED ({reason})")
+
+    def _report(self, jobs):
+        done = [j for j in jobs if j.status == "done"]
+        failed = [j for j in jobs if j.status != "done"]
+        print(f"Veo generation finished: {len(done)} succeeded, {len(failed)} failed.")
+        for job in failed:
+            print(f"  - Segment {job.index+1}: {job.error}")
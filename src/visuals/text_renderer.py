@@ -1,95 +1,213 @@
 from PIL import Image, ImageDraw, ImageFont
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.utils.file_cache import cache_root, hash_file, hash_key, link_or_copy, shared_cache
+from src.utils.subtitle import generate_ass
+from src.utils.trace import bind, span
+
+# Bump when drawing changes so cached overlays are re-rendered.
+OVERLAY_VERSION = 1
+
+# Resolved font path by configured path, process-wide; loaded fonts by (path,
+# size) per thread, since a FreeType face must not be used by two threads at once
+_font_paths = {}
+_font_lock = threading.Lock()
+_thread_fonts = threading.local()
 
 class TextRenderer:
     def __init__(self, config):
         self.config = config
-        # self.font_path and self.font_size are now handled by _load_font
         self.resolution = tuple(config.get("video", {}).get("resolution", (1080, 1920)))
+        text_config = config.get("text", {})
+        self.font_size = text_config.get("font_size", 60)
+        self.outline_width = text_config.get("outline_width", 3)
+        self.text_color = text_config.get("color", "white")
+        self.outline_color = text_config.get("outline_color", "black")
+        self.highlight_color = text_config.get("highlight_color", "gold")
+        # overlay: one PNG per line; karaoke (opt-in): per-word ASS captions burned in by the clip encode
+        self.mode = text_config.get("mode", "overlay")
+        self.workers = text_config.get("render_workers") or min(8, os.cpu_count() or 1)
+        self.overlay_cache = None
+        if config.get("cache", {}).get("text", True):
+            self.overlay_cache = shared_cache(os.path.join(cache_root(config), "text"),
+                                              max_bytes=int(config.get("cache", {}).get("text_max_mb", 256) * 1024 * 1024),
+                                              name="Text overlay cache")
 
-    def _load_font(self):
-        """Loads a font that supports Hindi/Devanagari."""
-        font_path = self.config.get("text", {}).get("font_path", None)
-        font_size = self.config.get("text", {}).get("font_size", 60)
-        
-        # Priority 1: Configured Font
-        if font_path and os.path.exists(font_path):
-            try:
-                return ImageFont.truetype(font_path, font_size)
-            except Exception as e:
-                print(f"Error loading config font: {e}")
-
-        # Priority 2: macOS System Font (Kohinoor - Excellent for Indic)
-        # Kohinoor.ttc usually contains Devanagari. Index may vary, but 0 often works or auto-resolved.
-        # Alternatively, 'Kohinoor Devanagari' might be needed if accessing by name, but path is safer.
-        macos_font = "/System/Library/Fonts/Kohinoor.ttc"
-        if os.path.exists(macos_font):
-             try:
-                # Try index 1 which is often Devanagari in the collection, or default
-                # Just loading the TTC usually works for standard chars, but let's try.
-                return ImageFont.truetype(macos_font, font_size)
-             except Exception:
-                pass
-        
-        macos_fallback = "/System/Library/Fonts/Supplemental/Arial Unicode.ttf"
-        if os.path.exists(macos_fallback):
-            return ImageFont.truetype(macos_fallback, font_size)
-
-        # Priority 3: Bundled Font (if user added it)
-        bundled_font = os.path.join(os.path.dirname(__file__), '../../assets/fonts/NotoSansDevanagari.ttf')
-        if os.path.exists(bundled_font):
-            return ImageFont.truetype(bundled_font, font_size)
-            
-        # Priority 4: Linux/Generic Paths
-        linux_fonts = [
+    def _font_path(self):
+        """Resolves the Hindi/Devanagari-capable font file once per process (None = PIL default)."""
+        configured = self.config.get("text", {}).get("font_path", None)
+        with _font_lock:
+            if configured in _font_paths:
+                return _font_paths[configured]
+
+        candidates = [
+            # Priority 1: Configured Font
+            configured,
+            # Priority 2: macOS System Font (Kohinoor - Excellent for Indic)
+            # Kohinoor.ttc usually contains Devanagari. Index may vary, but 0 often works or auto-resolved.
+            "/System/Library/Fonts/Kohinoor.ttc",
+            "/System/Library/Fonts/Supplemental/Arial Unicode.ttf",
+            # Priority 3: Bundled Font (if user added it)
+            os.path.join(os.path.dirname(__file__), '../../assets/fonts/NotoSansDevanagari.ttf'),
+            # Priority 4: Linux/Generic Paths
             "/usr/share/fonts/truetype/noto/NotoSansDevanagari-Regular.ttf",
             "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-            "arial.ttf"
+            "arial.ttf",
         ]
-        
-        for f in linux_fonts:
-            if os.path.exists(f):
-                return ImageFont.truetype(f, font_size)
-        
-        print("WARNING: No suitable Hindi font found. Text may not render correctly.")
-        return ImageFont.load_default()
+        resolved = None
+        for path in candidates:
+            if not path or not os.path.exists(path):
+                continue
+            try:
+                ImageFont.truetype(path, self.font_size)
+                resolved = path
+                break
+            except Exception as e:
+                print(f"Error loading font {path}: {e}")
 
-    def render_text_overlay(self, text, output_path):
+        if resolved is None:
+            print("WARNING: No suitable Hindi font found. Text may not render correctly.")
+        with _font_lock:
+            _font_paths[configured] = resolved
+        return resolved
+
+    def _load_font(self):
+        """Loads a font that supports Hindi/Devanagari (cached per thread, path and size)."""
+        path = self._font_path()
+        key = (path, self.font_size)
+        fonts = getattr(_thread_fonts, "fonts", None)
+        if fonts is None:
+            fonts = _thread_fonts.fonts = {}
+        if key not in fonts:
+            fonts[key] = ImageFont.truetype(path, self.font_size) if path else ImageFont.load_default()
+        return fonts[key]
+
+    def font_name(self):
+        """Family name libass should look up (text.font_name, else the resolved font's family)."""
+        configured = self.config.get("text", {}).get("font_name")
+        if configured:
+            return configured
+        font = self._load_font()
+        if hasattr(font, "getname"):
+            return font.getname()[0]
+        return "Noto Sans Devanagari"
+
+    def ass_style(self):
+        """Keyword arguments for generate_ass matching this renderer's text settings."""
+        return {
+            "resolution": self.resolution,
+            "font_name": self.font_name(),
+            "font_size": self.font_size,
+            "color": self.text_color,
+            "highlight_color": self.highlight_color,
+            "outline_color": self.outline_color,
+            "outline_width": self.outline_width,
+        }
+
+    def render_captions(self, segments, text_dir):
         """
-        Create a transparent PNG with the text centered or positioned.
+        Writes one karaoke .ass file per lyrics segment, timed from the
+        segment's start so the compositor can burn it into that clip.
+        Returns {segment_index: {"path", "fontsdir"}}.
         """
-        # Create transparent image
-        img = Image.new('RGBA', self.resolution, (0, 0, 0, 0))
-        draw = ImageDraw.Draw(img)
+        font_path = self._font_path()
+        fontsdir = os.path.dirname(os.path.abspath(font_path)) if font_path else None
+        style = self.ass_style()
+        captions = {}
+        for i, seg in enumerate(segments):
+            if seg.get("type", "lyrics") != "lyrics" or not seg.get("text", "").strip():
+                continue
+            path = os.path.join(text_dir, f"captions_{i:03d}.ass")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(generate_ass([seg], offset=seg["start"], **style))
+            captions[i] = {"path": path, "fontsdir": fontsdir}
+        print(f"Wrote karaoke captions for {len(captions)} segment(s) (font: {style['font_name']})")
+        return captions
 
+    def _cache_key(self, text):
+        font_path = self._font_path()
+        return hash_key({
+            "version": OVERLAY_VERSION,
+            "text": text,
+            "font": hash_file(font_path) if font_path else None,
+            "size": self.font_size,
+            "outline": [self.outline_width, self.outline_color],
+            "color": self.text_color,
+            "resolution": list(self.resolution),
+        })
+
+    def render_text_overlay(self, text, output_path):
+        """
+        Create a transparent PNG cropped tightly around the text.
+        Returns {"path", "x", "y"}: where the compositor should place it on the frame.
+        """
         font = self._load_font()
 
         # Check for Raqm support (libraqm) implicitly via Pillow
         # Pillow >= 4.2.0 uses Raqm if installed for complex scripts
-        
+        measure = ImageDraw.Draw(Image.new('RGBA', (1, 1)))
+
         # Calculate text size using textbbox (newer Pillow)
-        bbox = draw.textbbox((0, 0), text, font=font)
+        bbox = measure.textbbox((0, 0), text, font=font)
         text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-        
+
         # Position: Bottom center usually good for subtitles
-        x = (self.resolution[0] - text_width) / 2
-        y = self.resolution[1] - (self.resolution[1] * 0.15) # 15% from bottom
-
-        # Draw text with shadow/outline for visibility
-        shadow_color = "black"
-        text_color = "white"
-        outline_width = 3
-        
-        # Draw outline/shadow
-        for adj in range(-outline_width, outline_width+1):
-           for adj2 in range(-outline_width, outline_width+1):
-               draw.text((x+adj, y+adj2), text, font=font, fill=shadow_color)
-
-        draw.text((x, y), text, font=font, fill=text_color)
-        
+        x = round((self.resolution[0] - text_width) / 2)
+        y = round(self.resolution[1] - (self.resolution[1] * 0.15)) # 15% from bottom
+
+        # Footprint including the outline, in frame coordinates
+        left, top, right, bottom = measure.textbbox((x, y), text, font=font, stroke_width=self.outline_width)
+        left, top = int(left), int(top)
+        overlay = {"path": output_path, "x": left, "y": top}
+
+        key = None
+        if self.overlay_cache:
+            key = self._cache_key(text)
+            cached = self.overlay_cache.get(key)
+            if cached:
+                link_or_copy(cached, output_path)
+                return overlay
+
+        img = Image.new('RGBA', (max(1, int(right) - left), max(1, int(bottom) - top)), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(img)
+
+        # Draw text with outline for visibility (single pass)
+        draw.text((x - left, y - top), text, font=font, fill=self.text_color,
+                  stroke_width=self.outline_width, stroke_fill=self.outline_color)
+
+        # Unlink first: output_path may be a hardlink into the overlay cache
+        # (a previous hit), and saving through it would overwrite that entry.
+        if os.path.lexists(output_path):
+            os.remove(output_path)
         img.save(output_path)
+        if key:
+            self.overlay_cache.put(key, output_path, meta={"text": text})
         print(f"Saved text overlay: {output_path}")
+        return overlay
+
+    def render_segments(self, segments, text_dir):
+        """
+        Renders overlays for every lyrics segment in parallel.
+        Returns {segment_index: overlay} (see render_text_overlay).
+        """
+        jobs = []
+        for i, seg in enumerate(segments):
+            # Only render text for actual lyrics, skip Intro/Outro/Bridge labels
+            if seg.get("type", "lyrics") != "lyrics" or not seg.get("text", "").strip():
+                continue
+            jobs.append((i, seg["text"], os.path.join(text_dir, f"text_{i:03d}.png")))
+
+        # Resolve the font file once before fanning out; each worker loads its own face
+        self._font_path()
+        with span("text overlays", cat="render", count=len(jobs)), \
+                ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+            overlays = list(pool.map(bind(lambda job: self.render_text_overlay(job[1], job[2])), jobs))
+
+        if self.overlay_cache:
+            print(self.overlay_cache.summary())
+        return {job[0]: overlay for job, overlay in zip(jobs, overlays)}
 
 if __name__ == "__main__":
     # Test
@@ -0,0 +1,25 @@
+import pytest
+
+pytest.importorskip("ffmpeg")
+pytest.importorskip("numpy")
+
+from src.video.compositor import VideoCompositor
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_render_failures_name_the_segment_on_both_paths(tmp_path, monkeypatch, workers):
+    asset = tmp_path / "scene.png"
+    asset.write_bytes(b"png")
+    segments = [{"type": "lyrics", "text": f"line {i}", "start": i, "end": i + 1, "asset_path": str(asset)}
+                for i in range(3)]
+    compositor = VideoCompositor({"video": {"render_workers": workers}, "cache": {"clips": False}})
+
+    def render(task, clip_cache, x264_threads=None):
+        if task["index"] == 1:
+            raise OSError("ffmpeg exited with 1")
+        return task["clip_path"]
+    monkeypatch.setattr(compositor, "_probe_videos", lambda segments, tasks: None)
+    monkeypatch.setattr(compositor, "_render_cached_clip", render)
+
+    with pytest.raises(RuntimeError, match=r"Failed to render segment 2 \(.*scene\.png\): ffmpeg exited with 1"):
+        compositor.create_video(segments, str(tmp_path / "audio.wav"), str(tmp_path / "out.mp4"))
@@ -0,0 +1,42 @@
+from src.utils.dedup import line_key, mark_repeats
+
+
+def lyrics(*lines, visuals=None):
+    segments = [{"type": "intro", "text": ""}]
+    for i, text in enumerate(lines):
+        seg = {"type": "lyrics", "text": text}
+        if visuals:
+            seg["visual_description"] = visuals[i]
+        segments.append(seg)
+    return segments
+
+
+def test_normalized_key_ignores_case_and_punctuation():
+    assert line_key("Machli Jal Ki Rani Hai!") == line_key("machli jal ki rani hai")
+    assert line_key("Hello!", match="exact") != line_key("hello", match="exact")
+
+
+def test_repeats_point_at_the_first_occurrence_with_cycling_variations():
+    segments = lyrics("chorus line", "verse", "Chorus line!", "chorus line", "chorus line")
+    assert mark_repeats(segments, variations=["mirror", "offset"]) == 3
+    assert [s.get("reuse_of") for s in segments] == [None, None, None, 1, 1, 1]
+    assert [s.get("variation") for s in segments[3:]] == ["mirror", "offset", "mirror"]
+
+
+def test_reuse_is_identical_by_default():
+    segments = lyrics("a b", "a b")
+    mark_repeats(segments)
+    assert segments[2]["reuse_of"] == 1 and segments[2]["variation"] is None
+
+
+def test_match_visual_requires_the_same_description():
+    segments = lyrics("a b", "a b", "a b", visuals=["fish swims", "fish hides", "fish swims"])
+    assert mark_repeats(segments, match_visual=True) == 1
+    assert "reuse_of" not in segments[2] and segments[3]["reuse_of"] == 1
+
+
+def test_stale_marks_are_cleared():
+    segments = lyrics("one", "two")
+    segments[2].update(reuse_of=1, variation="mirror")
+    assert mark_repeats(segments) == 0
+    assert "reuse_of" not in segments[2] and "variation" not in segments[2]
@@ -0,0 +1,122 @@
+import base64
+import hashlib
+
+import pytest
+
+pytest.importorskip("requests")
+
+from src.utils import download as dl
+from src.utils.retry import RetryPolicy
+
+CONTENT = bytes(range(256)) * 64
+
+
+class FakeResponse:
+    def __init__(self, body, offset, fail_after=None, md5=None):
+        self.body = body[offset:]
+        self.status_code = 206 if offset else 200
+        self.headers = {"Content-Length": str(len(self.body))}
+        if md5:
+            self.headers["x-goog-hash"] = f"crc32c=AAAAAA==, md5={base64.b64encode(md5).decode()}"
+        if offset:
+            self.headers["Content-Range"] = f"bytes {offset}-{len(body) - 1}/{len(body)}"
+        self.fail_after = fail_after
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        sent = 0
+        for start in range(0, len(self.body), 1024):
+            if self.fail_after is not None and sent >= self.fail_after:
+                raise ConnectionError("connection reset")
+            chunk = self.body[start:start + 1024]
+            sent += len(chunk)
+            yield chunk
+
+
+class FakeSession:
+    """
+    Serves body (CONTENT by default), honouring Range; the first response
+    dies part-way when fail_after is set. md5 is advertised in x-goog-hash.
+    """
+
+    def __init__(self, fail_after=None, body=CONTENT, md5=None):
+        self.fail_after = fail_after
+        self.body = body
+        self.md5 = md5
+        self.ranges = []
+
+    def get(self, url, headers=None, stream=True, timeout=None):
+        offset = int(headers.get("Range", "bytes=0-")[6:-1]) if headers and "Range" in headers else 0
+        self.ranges.append(offset)
+        fail_after, self.fail_after = self.fail_after, None
+        return FakeResponse(self.body, offset, fail_after, self.md5)
+
+
+@pytest.fixture
+def session(monkeypatch):
+    def install(**kwargs):
+        fake = FakeSession(**kwargs)
+        monkeypatch.setattr(dl, "get_session", lambda: fake)
+        return fake
+    return install
+
+
+def test_retry_resumes_from_bytes_on_disk(tmp_path, session):
+    fake = session(fail_after=4096)
+    out = tmp_path / "clip.mp4"
+    dl.download("https://example/clip", str(out), policy=RetryPolicy(base_delay=0))
+
+    assert out.read_bytes() == CONTENT
+    assert fake.ranges == [0, 4096]
+    assert not (tmp_path / "clip.mp4.part").exists()
+
+
+def test_stale_part_from_an_earlier_download_is_not_resumed(tmp_path, session):
+    fake = session()
+    out = tmp_path / "clip.mp4"
+    (tmp_path / "clip.mp4.part").write_bytes(b"x" * 5000)
+    dl.download("https://example/new-clip", str(out), policy=RetryPolicy(base_delay=0))
+
+    assert out.read_bytes() == CONTENT
+    assert fake.ranges == [0]
+
+
+def test_size_mismatch_is_rejected_and_part_removed(tmp_path, session):
+    session()
+    out = tmp_path / "clip.mp4"
+    with pytest.raises(dl.DownloadError):
+        dl.download("https://example/clip", str(out), expected_size=len(CONTENT) + 1,
+                    policy=RetryPolicy(base_delay=0))
+    assert not out.exists()
+    assert not (tmp_path / "clip.mp4.part").exists()
+
+
+def test_checksums_are_verified(tmp_path, session):
+    session(md5=hashlib.md5(CONTENT).digest())
+    out = tmp_path / "clip.mp4"
+    dl.download("https://example/clip", str(out), expected_sha256=hashlib.sha256(CONTENT).hexdigest().upper(),
+                policy=RetryPolicy(base_delay=0))
+    assert out.read_bytes() == CONTENT
+
+    with pytest.raises(dl.DownloadError, match="sha256"):
+        dl.download("https://example/clip", str(tmp_path / "other.mp4"), expected_sha256="0" * 64,
+                    policy=RetryPolicy(base_delay=0))
+    assert not (tmp_path / "other.mp4").exists()
+
+
+def test_corrupted_body_of_the_right_length_is_rejected(tmp_path, session):
+    corrupted = bytes([CONTENT[0] ^ 1]) + CONTENT[1:]
+    session(body=corrupted, md5=hashlib.md5(CONTENT).digest())
+    out = tmp_path / "clip.mp4"
+    with pytest.raises(dl.DownloadError, match="md5"):
+        dl.download("https://example/clip", str(out), policy=RetryPolicy(base_delay=0))
+    assert not out.exists()
+    assert not (tmp_path / "clip.mp4.part").exists()
@@ -0,0 +1,109 @@
+import json
+import os
+import time
+
+from src.utils.file_cache import FileCache, hash_file, link_or_copy, shared_cache
+
+
+def _manifest(root):
+    with open(os.path.join(root, FileCache.MANIFEST)) as f:
+        return json.load(f)
+
+
+def test_shared_cache_is_one_instance_per_root(tmp_path):
+    a = shared_cache(str(tmp_path / "c"), name="a")
+    b = shared_cache(os.path.join(str(tmp_path), ".", "c"), name="b")
+    assert a is b
+    assert shared_cache(str(tmp_path / "other")) is not a
+
+
+def test_shared_cache_warns_about_ignored_settings(tmp_path, capsys):
+    root = str(tmp_path / "c")
+    cache = shared_cache(root, max_bytes=10, max_age_s=60)
+    assert shared_cache(root, max_bytes=10, max_age_s=60) is cache
+    assert "Warning" not in capsys.readouterr().out
+
+    assert shared_cache(root, max_bytes=20) is cache
+    out = capsys.readouterr().out
+    assert "max_bytes=20 (using 10)" in out and "max_age_s" not in out
+    assert cache.max_bytes == 10
+
+
+def test_saving_keeps_entries_committed_by_another_instance(tmp_path):
+    root = str(tmp_path / "c")
+    first, second = FileCache(root), FileCache(root)
+    first.put_data("one", b"1")
+    second.put_data("two", b"2")
+
+    assert set(_manifest(root)) == {"one", "two"}
+    assert FileCache(root).get_data("one") == b"1"
+
+
+def test_removed_entries_are_not_merged_back(tmp_path):
+    root = str(tmp_path / "c")
+    cache = FileCache(root, max_bytes=3)
+    cache.put_data("old", b"123")
+    cache.put_data("new", b"456")  # evicts "old"
+
+    assert set(_manifest(root)) == {"new"}
+    assert cache.get("old") is None
+
+
+def test_hits_do_not_rewrite_the_manifest_until_flushed(tmp_path):
+    root = str(tmp_path / "c")
+    cache = FileCache(root)
+    cache.put_data("k", b"v")
+    before = _manifest(root)["k"]["last_used"]
+
+    assert cache.get("k")
+    assert _manifest(root)["k"]["last_used"] == before
+    cache.flush()
+    assert _manifest(root)["k"]["last_used"] > before
+
+
+def test_eviction_drops_least_recently_used_first(tmp_path):
+    cache = FileCache(str(tmp_path / "c"), max_bytes=6)
+    cache.put_data("a", b"111")
+    cache.put_data("b", b"222")
+    assert cache.get("a")  # "b" is now the least recently used
+    cache.put_data("c", b"333")
+
+    assert cache.get("a") and cache.get("c")
+    assert cache.get("b") is None
+    assert cache.total_bytes() == 6
+
+
+def test_expired_entries_are_misses_and_removed(tmp_path, monkeypatch):
+    cache = FileCache(str(tmp_path / "c"), max_age_s=60)
+    path = cache.put_data("k", b"v")
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+
+    assert cache.get("k") is None
+    assert not os.path.exists(path)
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+def test_put_hardlinks_and_link_or_copy_replaces_destination(tmp_path):
+    src = tmp_path / "clip.mp4"
+    src.write_bytes(b"video")
+    cache = FileCache(str(tmp_path / "c"), sidecars=True)
+    cached = cache.put("k", str(src), meta={"prompt": "p"})
+    assert os.path.samefile(cached, src)
+    with open(f"{cached}.json") as f:
+        assert json.load(f)["meta"] == {"prompt": "p"}
+
+    dst = tmp_path / "out.mp4"
+    dst.write_bytes(b"stale")
+    link_or_copy(cached, str(dst))
+    assert os.path.samefile(cached, dst)
+    assert dst.read_bytes() == b"video"
+
+
+def test_hash_file_sees_rewritten_contents(tmp_path):
+    path = tmp_path / "f"
+    path.write_bytes(b"one")
+    first = hash_file(str(path))
+    assert hash_file(str(path)) == first
+    path.write_bytes(b"two!")
+    assert hash_file(str(path)) != first
@@ -0,0 +1,67 @@
+import pytest
+
+from src.utils import retry
+from src.utils.retry import RateLimiter, RetryPolicy, call_with_retries, is_retryable
+
+
+class APIError(Exception):
+    def __init__(self, code):
+        super().__init__(f"{code}")
+        self.code = code
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(retry.time, "sleep", slept.append)
+    return slept
+
+
+def flaky(*failures):
+    """fn that raises each of `failures` in turn, then returns 'ok'; .calls counts invocations."""
+    failures = list(failures)
+    def fn():
+        fn.calls += 1
+        if failures:
+            raise failures.pop(0)
+        return "ok"
+    fn.calls = 0
+    return fn
+
+
+def test_retryable_errors():
+    assert is_retryable(APIError(429)) and is_retryable(APIError(503))
+    assert is_retryable(ConnectionError()) and is_retryable(TimeoutError())
+    assert not is_retryable(APIError(400)) and not is_retryable(ValueError())
+
+
+def test_transient_failures_are_retried_with_backoff(sleeps):
+    fn = flaky(APIError(429), APIError(503))
+    assert call_with_retries(fn, policy=RetryPolicy(base_delay=1.0, max_delay=1.5)) == "ok"
+    assert fn.calls == 3
+    assert len(sleeps) == 2 and all(0 <= s <= 1.5 for s in sleeps)
+
+
+def test_permanent_failure_is_raised_at_once(sleeps):
+    fn = flaky(APIError(400))
+    with pytest.raises(APIError):
+        call_with_retries(fn)
+    assert fn.calls == 1 and not sleeps
+
+
+def test_gives_up_after_max_attempts(sleeps):
+    fn = flaky(*[APIError(503)] * 5)
+    with pytest.raises(APIError):
+        call_with_retries(fn, policy=RetryPolicy(max_attempts=3))
+    assert fn.calls == 3 and len(sleeps) == 2
+
+
+def test_rate_limiter_allows_a_burst_then_paces(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(retry.time, "monotonic", lambda: now[0])
+    limiter = RateLimiter(60, burst=2)  # one token per second
+
+    assert [limiter._reserve() for _ in range(3)] == [0.0, 0.0, 1.0]
+    now[0] += 2.0  # repays the debt and refills one token
+    assert limiter._reserve() == 0.0
+    assert limiter._reserve() == pytest.approx(1.0)
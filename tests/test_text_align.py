@@ -0,0 +1,50 @@
+from src.utils.text_align import align_words, interpolate_missing, normalize_token
+
+
+def _asr(tokens, dropped=(), step=0.5):
+    words = []
+    for k, tok in enumerate(tokens):
+        if k not in dropped:
+            words.append({"word": tok, "start": k * step, "end": k * step + 0.3, "score": 0.9})
+    return words
+
+
+def test_repeated_chorus_keeps_each_repetition_in_place():
+    chorus = [f"शब्द{i}" for i in range(17)]
+    lyrics = chorus * 10
+    dropped = {3, 40, 77, 120, 161}
+    words, stats = align_words(_asr(lyrics, dropped), " ".join(lyrics))
+
+    assert stats["lyric_tokens"] == 170
+    assert [w["word"] for w in words] == lyrics
+    for k, w in enumerate(words):
+        assert abs(w["start"] - k * 0.5) <= 0.5, (k, w)
+
+
+def test_keeps_lyric_spelling_and_times_every_token():
+    asr = [{"word": "Machli,", "start": 0.0, "end": 0.4},
+           {"word": "jal", "start": 0.5, "end": 0.7},
+           {"word": "raani", "start": 1.0, "end": 1.4}]
+    words, stats = align_words(asr, "machli jal ki rani")
+
+    assert [w["word"] for w in words] == ["machli", "jal", "ki", "rani"]
+    assert stats["matched"] >= 3
+    starts = [w["start"] for w in words]
+    assert starts == sorted(starts) and starts[0] == 0.0 and words[-1]["end"] == 1.4
+
+
+def test_nothing_to_align():
+    assert align_words([], "jal ki rani")[0] is None
+    assert align_words([{"word": "...", "start": 0, "end": 1}], "jal")[0] is None
+
+
+def test_normalize_token_is_lenient_on_devanagari_marks():
+    assert normalize_token("ज़रा,") == normalize_token("जरा")
+    assert normalize_token("चाँद") == normalize_token("चांद")
+
+
+def test_interpolate_missing_spreads_run_over_gap():
+    words = [{"start": 0.0, "end": 1.0}, {"start": None, "end": None},
+             {"start": None, "end": None}, {"start": 3.0, "end": 3.5}]
+    assert interpolate_missing(words) == 2
+    assert (words[1]["start"], words[1]["end"], words[2]["end"]) == (1.0, 2.0, 3.0)
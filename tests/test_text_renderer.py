@@ -0,0 +1,68 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("PIL")
+from PIL import Image
+
+from src.visuals.text_renderer import TextRenderer
+
+
+def _renderer(tmp_path):
+    return TextRenderer({"video": {"resolution": [320, 240]}, "text": {"font_size": 20},
+                         "cache": {"dir": str(tmp_path / "cache")}})
+
+
+def _pixels(path):
+    with Image.open(path) as img:
+        return img.size, img.tobytes()
+
+
+def test_rerender_at_same_path_does_not_overwrite_cached_overlay(tmp_path):
+    renderer = _renderer(tmp_path)
+    out = str(tmp_path / "text_000.png")
+    other = str(tmp_path / "text_001.png")
+
+    renderer.render_text_overlay("hello", out)
+    renderer.render_text_overlay("hello", other)  # cache hit: linked to the entry
+    hello = _pixels(other)
+
+    # A miss at a path that is a hardlink to the "hello" entry
+    renderer.render_text_overlay("hello", out)
+    renderer.render_text_overlay("WORLD", out)
+    assert _pixels(out) != hello
+
+    cached = renderer.overlay_cache.get(renderer._cache_key("hello"))
+    assert _pixels(cached) == hello
+    os.remove(other)
+    renderer.render_text_overlay("hello", other)
+    assert _pixels(other) == hello
+
+
+def test_each_thread_gets_its_own_font(tmp_path):
+    renderer = _renderer(tmp_path)
+    font = renderer._load_font()
+    assert renderer._load_font() is font
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        other = pool.submit(renderer._load_font).result()
+    assert other is not font
+    assert other.size == font.size
+
+
+def test_parallel_render_matches_serial(tmp_path):
+    segments = [{"type": "lyrics", "text": f"line {i} of the song"} for i in range(12)]
+    serial = TextRenderer({"video": {"resolution": [320, 240]}, "text": {"font_size": 20, "render_workers": 1},
+                           "cache": {"text": False}})
+    parallel = TextRenderer({"video": {"resolution": [320, 240]}, "text": {"font_size": 20, "render_workers": 4},
+                             "cache": {"text": False}})
+    (tmp_path / "one").mkdir()
+    (tmp_path / "four").mkdir()
+    one = serial.render_segments(segments, str(tmp_path / "one"))
+    four = parallel.render_segments(segments, str(tmp_path / "four"))
+
+    assert one.keys() == four.keys()
+    for i in one:
+        assert (one[i]["x"], one[i]["y"]) == (four[i]["x"], four[i]["y"])
+        assert _pixels(one[i]["path"]) == _pixels(four[i]["path"])
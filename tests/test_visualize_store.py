@@ -0,0 +1,55 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("click")
+pytest.importorskip("PIL")
+pytest.importorskip("ffmpeg")
+
+from src.pipeline import PoemRun
+from src.utils import llm
+
+
+@pytest.fixture
+def fake_backend():
+    yield lambda config: llm.configure(config)
+    llm.configure({})
+
+
+def make_run(tmp_path, run_id):
+    config = {
+        "project": {"output_dir": str(tmp_path / "output")},
+        "audio": {"lyrics_file": str(tmp_path / "poem.txt")},
+        "cache": {"dir": str(tmp_path / "cache")},
+        # No response cache: a real model returns new prompt text on every run
+        "llm": {"backend": "fake", "cache": {"enabled": False},
+                "fake": {"time_scale": 0, "image_size": [32, 32]}},
+        "veo": {"enabled": False},
+        "dedup": {"enabled": False},
+        "trace": {"enabled": False},
+    }
+    run = PoemRun(config, run_id=run_id, log=lambda msg: None)
+    run.prepare()
+    segments = [{"type": "lyrics", "text": f"line {i}", "start": i, "end": i + 1,
+                 "visual_description": f"scene {i}"} for i in range(3)]
+    with open(run.segments_path, "w") as f:
+        json.dump(segments, f)
+    with open(run.style_bible_path, "w") as f:
+        json.dump({"character": "a fish", "setting": "a reef", "style_bible_suffix": "3d"}, f)
+    return run
+
+
+def test_new_run_id_reuses_stored_assets_without_any_calls(tmp_path, fake_backend):
+    first = make_run(tmp_path, "one")
+    fake_backend(first.config)
+    client = llm.get_client()
+    assert first.step_visualize()
+    calls = {kind: stats["calls"] for kind, stats in client.calls.items()}
+    assert calls["generate_images"] == 3
+
+    second = make_run(tmp_path, "two")
+    assert second.step_visualize()
+    assert {kind: stats["calls"] for kind, stats in client.calls.items()} == calls
+    for seg in json.load(open(second.segments_path)):
+        assert os.path.exists(seg["asset_path"]) and "/two/" in seg["asset_path"]